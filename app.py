@@ -1,9 +1,17 @@
-import webview
+import atexit
 import threading
 from flask import Flask, render_template, request, Response, jsonify
-import pyautogui
-from pynput.keyboard import Controller, Key
-import time
+from typing_engine import PynputSink
+from job_manager import JobManager
+from progress import encode_event
+from text_source import FileSource
+from typeability import StrategyCache, analyze
+from run_stats import stats_file_from_env
+from profiling import Profiler, MODES
+from single_instance import InstanceLock, hand_off, HANDOFF_PATH, TOKEN_HEADER
+from wsgi_server import create_server
+from settings_store import SettingsStore
+from document_library import DocumentLibrary, PAGE_SIZE
 import json
 import os
 
@@ -14,98 +22,262 @@ APP_VERSION = "2.0.1"
 APP_VERSION_NAME = "Material UI Edition - Dark Mode Default"
 APP_RELEASE_DATE = "2025-12-24"
 
-# Global state
-typing_state = {
-    'is_typing': False,
-    'is_paused': False
-}
+# User settings, cached in memory and written behind (see settings_store)
+settings = SettingsStore()
+atexit.register(settings.flush)
 
-# Initialize keyboard controller
-keyboard = Controller()
+# Saved snippets and documents, searchable (see document_library). Opened on
+# first use, so importing the app doesn't create or touch the database
+library = None
+library_lock = threading.Lock()
+
+def get_library():
+    global library
+    with library_lock:
+        if library is None:
+            library = DocumentLibrary()
+        return library
+
+# Remembers which characters the keyboard could type in earlier runs
+strategy_cache = StrategyCache()
+
+# Per-run timing reports are also written to run_stats.json (next to
+# user_settings.json) when TYPINGBOT_SAVE_STATS is set
+stats_file = stats_file_from_env()
+
+# Profiles every job when TYPINGBOT_PROFILE is set, or the next one when
+# armed through /api/debug/profile
+profiler = Profiler.from_env()
+
+# Typing jobs are queued and typed one at a time on the pynput keyboard
+jobs = JobManager(PynputSink(), strategy_cache=strategy_cache,
+                  stats_file=stats_file, profiler=profiler)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/start-typing', methods=['POST'])
-def start_typing():
+def read_job_request():
+    """Parse text/speed/burst from a start request
+    
+    Instead of 'text', a 'path' to a local UTF-8 file may be given; it is
+    streamed from disk rather than sent in the request body.
+    """
     data = request.json
-    text = data.get('text', '')
+    path = data.get('path')
+    if path and os.path.isfile(path):
+        text = FileSource(path)
+    else:
+        text = data.get('text', '')
     speed = int(data.get('speed', 100))
+    # Burst mode: send whole runs of characters per keystroke call at max speed
+    burst = bool(data.get('burst', False))
+    return text, speed, burst
+
+def stream_job(job, since=0):
+    """Stream a job's progress frames (NDJSON) from its ring buffer"""
+    for frame in job.progress.subscribe(since):
+        yield json.dumps(frame) + '\n'
+
+@app.route('/api/start-typing', methods=['POST'])
+def start_typing():
+    text, speed, burst = read_job_request()
     
     if not text:
         return jsonify({'error': 'No text provided'}), 400
     
-    def generate():
-        global typing_state
-        typing_state['is_typing'] = True
-        typing_state['is_paused'] = False
-        
-        # Calculate delay
-        wps = float(speed)
-        if wps < 1:
-            wps = 1
-        
-        if wps >= 500:
-            delay = 0.000000001
-        else:
-            chars_per_second = wps * 6.0
-            delay = 1.0 / chars_per_second
-        
-        # Type each character using pynput
-        for i, char in enumerate(text):
-            if not typing_state['is_typing']:
-                break
-            
-            # Handle pause
-            while typing_state['is_paused'] and typing_state['is_typing']:
-                time.sleep(0.1)
-            
-            if not typing_state['is_typing']:
-                break
-            
-            # Type character
-            if char == '\n':
-                keyboard.press(Key.enter)
-                keyboard.release(Key.enter)
-            elif char == '\t':
-                keyboard.press(Key.tab)
-                keyboard.release(Key.tab)
-            elif char == ' ':
-                keyboard.press(Key.space)
-                keyboard.release(Key.space)
-            else:
-                try:
-                    keyboard.type(char)
-                except:
-                    print(f"Could not type: {char}")
-            
-            time.sleep(delay)
-            
-            # Send progress update
-            yield json.dumps({
-                'index': i,
-                'char': char,
-                'total': len(text)
-            }) + '\n'
-        
-        typing_state['is_typing'] = False
-    
-    return Response(generate(), mimetype='application/json')
+    job = jobs.submit(text, speed, burst)
+    return Response(stream_job(job), mimetype='application/json',
+                    headers={'X-Job-Id': job.id})
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze_text():
+    """Pre-flight check: Unicode-path, combining and untypeable characters"""
+    text = request.json.get('text', '')
+    return jsonify(analyze(text, strategy_cache))
+
+@app.route('/api/strategy-cache', methods=['GET'])
+def strategy_cache_failures():
+    """Characters skipped because they failed on an earlier run"""
+    return jsonify({'failures': strategy_cache.failures()})
+
+@app.route('/api/strategy-cache', methods=['DELETE'])
+def clear_strategy_cache():
+    """Retry earlier failures: the given 'chars', or all of them"""
+    data = request.get_json(silent=True) or {}
+    strategy_cache.clear(data.get('chars'))
+    return jsonify({'failures': strategy_cache.failures()})
 
 @app.route('/api/toggle-pause', methods=['POST'])
 def toggle_pause():
-    global typing_state
-    typing_state['is_paused'] = not typing_state['is_paused']
-    return jsonify({'paused': typing_state['is_paused']})
+    """Pause/resume whichever job is currently typing"""
+    job = jobs.active
+    if not job:
+        return jsonify({'paused': False})
+    # Through the job, so SSE watchers get a status frame
+    if job.engine.is_paused:
+        job.resume()
+    else:
+        job.pause()
+    return jsonify({'paused': job.engine.is_paused})
 
 @app.route('/api/stop-typing', methods=['POST'])
 def stop_typing():
-    global typing_state
-    typing_state['is_typing'] = False
-    typing_state['is_paused'] = False
+    """Stop whichever job is currently typing"""
+    job = jobs.active
+    if job:
+        job.stop()
     return jsonify({'stopped': True})
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify([job.to_dict() for job in jobs.list()])
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a job without streaming its progress"""
+    text, speed, burst = read_job_request()
+    
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    
+    job = jobs.submit(text, speed, burst)
+    return jsonify(job.to_dict()), 201
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/stats', methods=['GET'])
+def job_stats(job_id):
+    """Latency percentiles, achieved chars/sec, pauses and stalls for a job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.stats_report())
+
+@app.route('/api/jobs/<job_id>/progress', methods=['GET'])
+def job_progress(job_id):
+    """(Re)subscribe to a job's progress stream, optionally from ?since=<seq>"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    since = request.args.get('since', 0, type=int)
+    return Response(stream_job(job, since), mimetype='application/json')
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events progress channel; any number of clients can watch a job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # EventSource sends Last-Event-ID when it reconnects
+    since = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', 0, type=int)
+    
+    def generate():
+        yield 'retry: 1000\n\n'
+        for frame in job.progress.subscribe(since):
+            yield encode_event(frame)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/jobs/<job_id>/<action>', methods=['POST'])
+def control_job(job_id, action):
+    """Pause, resume or stop a specific job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    actions = {
+        'pause': job.pause,
+        'resume': job.resume,
+        'stop': job.stop
+    }
+    if action not in actions:
+        return jsonify({'error': f'Unknown action: {action}'}), 400
+    
+    actions[action]()
+    return jsonify(job.to_dict())
+
+@app.route('/api/documents', methods=['GET'])
+def list_documents():
+    """Document summaries (no bodies); ?q= searches, ?tag= filters"""
+    limit = min(request.args.get('limit', PAGE_SIZE, type=int), 500)
+    offset = request.args.get('offset', 0, type=int)
+    return jsonify(get_library().search(request.args.get('q', ''), request.args.get('tag'), limit, offset))
+
+@app.route('/api/documents', methods=['POST'])
+def add_document():
+    """Save text to the library; identical text returns the existing entry"""
+    data = request.get_json(silent=True) or {}
+    body = data.get('body') or data.get('text') or ''
+    if not body.strip():
+        return jsonify({'error': 'No text provided'}), 400
+    document, created = get_library().add(body, data.get('title'), data.get('tags', ''))
+    document['duplicate'] = not created
+    return jsonify(document), 201 if created else 200
+
+@app.route('/api/documents/tags', methods=['GET'])
+def document_tags():
+    return jsonify(get_library().tags())
+
+@app.route('/api/documents/<int:doc_id>', methods=['GET'])
+def get_document(doc_id):
+    document = get_library().get(doc_id)
+    if not document:
+        return jsonify({'error': 'Document not found'}), 404
+    return jsonify(document)
+
+@app.route('/api/documents/<int:doc_id>', methods=['PATCH'])
+def update_document(doc_id):
+    data = request.get_json(silent=True) or {}
+    document = get_library().update(doc_id, data.get('title'), data.get('tags'))
+    if not document:
+        return jsonify({'error': 'Document not found'}), 404
+    return jsonify(document)
+
+@app.route('/api/documents/<int:doc_id>', methods=['DELETE'])
+def delete_document(doc_id):
+    if not get_library().delete(doc_id):
+        return jsonify({'error': 'Document not found'}), 404
+    return jsonify({'deleted': doc_id})
+
+@app.route('/api/debug/profile', methods=['GET'])
+def profile_status():
+    return jsonify(profiler.status())
+
+@app.route('/api/debug/profile', methods=['POST'])
+def toggle_profile():
+    """Arm (or disarm) profiling of the next typing job
+    
+    Body: {"enabled": true, "mode": "pstats" | "collapsed"}
+    """
+    data = request.json or {}
+    if not data.get('enabled', True):
+        profiler.disarm()
+        return jsonify(profiler.status())
+    
+    mode = data.get('mode', 'pstats')
+    if mode not in MODES:
+        return jsonify({'error': f'Unknown profile mode: {mode}'}), 400
+    profiler.arm(mode)
+    return jsonify(profiler.status())
+
+@app.route(HANDOFF_PATH, methods=['POST'])
+def receive_handoff():
+    """Text sent by a second launch of the app (see single_instance)"""
+    if request.headers.get(TOKEN_HEADER) != instance_lock.token:
+        return jsonify({'error': 'Forbidden'}), 403
+    text = (request.json or {}).get('text', '')
+    if on_handoff:
+        on_handoff(text)
+    return jsonify({'received': len(text)})
+
 @app.route('/api/version', methods=['GET'])
 def get_version():
     """Return current version information (embedded, not from file)"""
@@ -125,35 +297,20 @@ def get_version():
 
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
-    """Load user settings from file"""
-    settings_file = 'user_settings.json'
-    default_settings = {
-        'darkMode': True,  # Dark mode enabled by default
-        'speed': 100,
-        'lastText': ''
-    }
-    
-    if os.path.exists(settings_file):
-        try:
-            with open(settings_file, 'r', encoding='utf-8') as f:
-                return jsonify(json.load(f))
-        except:
-            return jsonify(default_settings)
-    else:
-        return jsonify(default_settings)
+    """User settings (served from memory unless the file changed)"""
+    return jsonify(settings.get())
 
 @app.route('/api/settings', methods=['POST'])
 def save_settings():
-    """Save user settings to file"""
-    settings_file = 'user_settings.json'
+    """Update user settings; only the fields sent are changed
     
-    try:
-        data = request.json
-        with open(settings_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return jsonify({'success': True})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    The file is written shortly afterwards, once changes stop coming in.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+    settings.update(data)
+    return jsonify({'success': True})
 
 
 def check_version():
@@ -161,8 +318,37 @@ def check_version():
     print(f"TypingBot v{APP_VERSION} - {APP_VERSION_NAME}")
     return True
 
+# Set as soon as the server socket is bound (or binding failed)
+server_ready = threading.Event()
+server = None
+
+# Only one instance runs; later launches pass their text to it
+instance_lock = InstanceLock()
+# Called with text handed off by a second launch (set once the window exists)
+on_handoff = None
+
 def start_flask():
-    app.run(port=5000, debug=False, use_reloader=False)
+    """Serve the app on a background thread, signalling server_ready once bound
+    
+    Port 0 lets the OS pick a free port, so nothing else on the machine can
+    clash with it; the chosen port is in server.port. waitress is used when
+    installed (see wsgi_server), so control calls stay responsive while
+    progress streams are open.
+    """
+    global server
+    try:
+        server = create_server(app)
+        print(f"Serving on port {server.port} ({server.backend})")
+    finally:
+        server_ready.set()
+    server.serve_forever()
+
+def read_launch_text(argv):
+    """Text from a file given on the command line ('' if none)"""
+    if len(argv) > 1 and os.path.isfile(argv[1]):
+        with open(argv[1], 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    return ''
 
 if __name__ == '__main__':
     import json
@@ -178,12 +364,31 @@ if __name__ == '__main__':
         print("Application terminated due to version mismatch.")
         sys.exit(1)
     
+    launch_text = read_launch_text(sys.argv)
+    
+    # Already running: hand the text over and bring that window forward
+    if not instance_lock.acquire():
+        if hand_off(launch_text):
+            print("TypingBot is already running - text sent to it.")
+            sys.exit(0)
+        print("TypingBot is already running but could not be reached.")
+        sys.exit(1)
+    
     # Start Flask in background thread
     flask_thread = threading.Thread(target=start_flask, daemon=True)
     flask_thread.start()
     
-    # Wait a moment for Flask to start
-    time.sleep(2)
+    # The GUI backend loads while the server binds its socket
+    import webview
+    
+    # Open the window the moment the server is accepting connections
+    server_ready.wait()
+    if server is None:
+        print("Could not start the web server.")
+        sys.exit(1)
+    
+    instance_lock.publish(server.port)
+    url = f'http://127.0.0.1:{server.port}'
     
     # Load saved window settings
     config_file = 'window_config.json'
@@ -203,7 +408,7 @@ if __name__ == '__main__':
     # Create desktop window with Material UI
     window = webview.create_window(
         f'TypingBot v{APP_VERSION} - Bypass Text Pasting',
-        'http://localhost:5000',
+        url,
         width=config['width'],
         height=config['height'],
         x=config.get('x'),
@@ -228,5 +433,20 @@ if __name__ == '__main__':
     
     window.events.closed += save_window_pos
     
-    webview.start()
+    def show_text(text):
+        """Put text into the editor and bring the window to the front"""
+        if text:
+            window.evaluate_js(f'window.typingBot && window.typingBot.receiveText({json.dumps(text)})')
+        window.restore()
+        window.show()
+    
+    on_handoff = show_text
+    if launch_text:
+        window.events.loaded += lambda: window.evaluate_js(
+            f'window.typingBot && window.typingBot.receiveText({json.dumps(launch_text)})')
+    
+    try:
+        webview.start()
+    finally:
+        instance_lock.release()
 
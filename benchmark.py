@@ -0,0 +1,336 @@
+"""Headless benchmarks for the typing engine
+
+Everything runs against typing_engine.NullSink, so no keystrokes are sent
+and no display is needed. Results are written as JSON so runs from
+different releases can be compared with --compare.
+
+Usage:
+    python benchmark.py                      # full suite (1 KB - 10 MB)
+    python benchmark.py --quick              # small inputs only
+    python benchmark.py --only engine,highlight
+    python benchmark.py --compare old.json   # show change vs an earlier run
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from typing_engine import TypingEngine, NullSink, calculate_delay
+from keystroke_plan import compile_plan
+from graphemes import cluster_bounds, next_clusters
+from job_manager import JobManager
+from run_stats import RunStats
+from text_source import iter_chunks
+
+RESULTS_FILE = 'benchmark_results.json'
+
+KB = 1024
+MB = 1024 * KB
+SIZES = [KB, 100 * KB, MB, 10 * MB]
+QUICK_SIZES = [KB, 100 * KB]
+
+# Paced speeds are timed for a fixed duration; 500 WPS and burst run flat out
+PACED_SPEEDS = [1, 100]
+MAX_SPEED = 500
+
+WORDS = {
+    'ascii': ("the quick brown fox jumps over lazy dog typing engine keyboard "
+              "paste bypass speed words per second benchmark").split(),
+    'bangla': "আমার সোনার বাংলা আমি তোমায় ভালোবাসি ক্ষমা প্রার্থনা বিজ্ঞান স্বপ্ন রবীন্দ্রনাথ".split(),
+}
+# Mixed whitespace: words separated by spaces, tabs, LF and CRLF line breaks
+SEPARATORS = {
+    'ascii': [' '],
+    'bangla': [' '],
+    'whitespace': [' ', ' ', '\t', '\n', '\r\n', '  '],
+}
+
+
+def make_text(script, size, seed=0):
+    """Roughly `size` bytes of UTF-8 text in the given script
+
+    Words are picked at random so consecutive chunks differ and the
+    keystroke plan cache can't make large inputs look faster than they are.
+    """
+    rng = random.Random(seed)
+    words = WORDS.get(script, WORDS['ascii'])
+    separators = SEPARATORS[script]
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        separator = rng.choice(separators)
+        parts.append(word)
+        parts.append(separator)
+        length += len(word.encode('utf-8')) + len(separator)
+    return ''.join(parts)
+
+
+def size_label(size):
+    return f"{size // MB}MB" if size >= MB else f"{size // KB}KB"
+
+
+def engine_throughput(script, size, wps, burst):
+    """Flat-out typing of a whole text through the streaming entry point"""
+    text = make_text(script, size)
+    compile_plan.cache_clear()
+    engine = TypingEngine(NullSink(), stats=RunStats())
+
+    started = time.perf_counter()
+    for _ in engine.run_chunks(iter_chunks(text), wps, burst):
+        pass
+    elapsed = time.perf_counter() - started
+
+    inject = engine.stats.inject.summary()
+    return {
+        'chars': len(text),
+        'bytes': len(text.encode('utf-8')),
+        'seconds': round(elapsed, 4),
+        'cps': round(len(text) / elapsed, 1),
+        'mb_per_s': round(len(text.encode('utf-8')) / MB / elapsed, 3),
+        'sink_calls': engine.sink.calls,
+        'inject_p99_ms': inject.get('p99')
+    }
+
+
+def engine_pacing(script, wps, duration):
+    """Pacing accuracy: achieved vs requested speed over about `duration` seconds
+
+    The engine paces one grapheme cluster per tick, so accuracy is measured
+    in clusters; a Bangla conjunct counts once however many code points it has.
+    """
+    tick_rate = 1.0 / calculate_delay(wps)
+    ticks = max(int(tick_rate * duration), 2)
+    text = make_text(script, ticks * 8)
+    plan = compile_plan(text)
+    text = text[:plan.ends[ticks - 1]]
+    stats = RunStats()
+    engine = TypingEngine(NullSink(), stats=stats)
+
+    stats.begin()
+    typed = 0
+    for i, _ in engine.run(text, wps):
+        typed = i + 1
+    stats.finish(typed)
+
+    report = stats.summary()
+    ticks_per_second = ticks / report['elapsed']
+    return {
+        'chars': typed,
+        'clusters': ticks,
+        'seconds': report['elapsed'],
+        # Characters per second the pacing aims for (clusters can be several)
+        'target_cps': round(tick_rate * typed / ticks, 1),
+        'cps': round(typed / report['elapsed'], 1),
+        'error_pct': round((ticks_per_second / tick_rate - 1) * 100, 2),
+        'inject_p50_ms': report['inject'].get('p50'),
+        'inject_p99_ms': report['inject'].get('p99'),
+        'overshoot_p50_ms': report['overshoot'].get('p50'),
+        'overshoot_p99_ms': report['overshoot'].get('p99'),
+        'stalls': report['stalls']
+    }
+
+
+def bench_engine(sizes, duration):
+    results = []
+    for script in ('ascii', 'bangla', 'whitespace'):
+        for wps in PACED_SPEEDS:
+            results.append(dict(group='engine', name=f'paced/{script}/{wps}wps',
+                                **engine_pacing(script, wps, duration)))
+        for size in sizes:
+            results.append(dict(group='engine', name=f'max/{script}/{size_label(size)}',
+                                **engine_throughput(script, size, MAX_SPEED, False)))
+            results.append(dict(group='engine', name=f'burst/{script}/{size_label(size)}',
+                                **engine_throughput(script, size, MAX_SPEED, True)))
+    return results
+
+
+def bench_progress(sizes):
+    """Cost of the job queue + progress frames, and of streaming them over Flask"""
+    results = []
+    text = make_text('ascii', sizes[-1] if sizes[-1] <= MB else MB)
+
+    compile_plan.cache_clear()
+    started = time.perf_counter()
+    for _ in TypingEngine(NullSink()).run_chunks(iter_chunks(text), MAX_SPEED, True):
+        pass
+    direct = time.perf_counter() - started
+
+    # Job manager: same run, plus coalesced frames into the ring buffer
+    manager = JobManager(NullSink())
+    compile_plan.cache_clear()
+    started = time.perf_counter()
+    job = manager.submit(text, MAX_SPEED, burst=True)
+    job.wait()
+    queued = time.perf_counter() - started
+    results.append({
+        'group': 'progress',
+        'name': f'job/{size_label(len(text))}',
+        'chars': len(text),
+        'seconds': round(queued, 4),
+        'direct_seconds': round(direct, 4),
+        'overhead_pct': round((queued / direct - 1) * 100, 2),
+        'frames': job.progress.seq,
+        'ui_p99_ms': job.stats.summary()['ui'].get('p99')
+    })
+
+    # Flask test client: POST /api/start-typing and read the whole NDJSON stream
+    try:
+        import app as web_app
+    except Exception as e:
+        results.append({'group': 'progress', 'name': 'flask/start-typing',
+                        'skipped': f"{type(e).__name__}: {e}"})
+        return results
+
+    web_app.jobs = JobManager(NullSink())
+    client = web_app.app.test_client()
+    compile_plan.cache_clear()
+    started = time.perf_counter()
+    response = client.post('/api/start-typing', json={'text': text, 'speed': MAX_SPEED, 'burst': True})
+    lines = response.get_data(as_text=True).splitlines()
+    streamed = time.perf_counter() - started
+    results.append({
+        'group': 'progress',
+        'name': f'flask/start-typing/{size_label(len(text))}',
+        'chars': len(text),
+        'seconds': round(streamed, 4),
+        'direct_seconds': round(direct, 4),
+        'overhead_pct': round((streamed / direct - 1) * 100, 2),
+        'frames': len(lines)
+    })
+    return results
+
+
+def bench_highlight(frames=20000):
+    """Per-frame cost of finding the current cluster and preview text"""
+    results = []
+    for script in ('ascii', 'bangla'):
+        text = make_text(script, 100 * KB)
+        step = max(len(text) // frames, 1)
+        positions = range(0, len(text), step)
+
+        started = time.perf_counter()
+        for index in positions:
+            start, end = cluster_bounds(text, index)
+            next_clusters(text, end, 3)
+        elapsed = time.perf_counter() - started
+        results.append({
+            'group': 'highlight',
+            'name': f'clusters/{script}',
+            'frames': len(positions),
+            'seconds': round(elapsed, 4),
+            'us_per_frame': round(elapsed / len(positions) * 1e6, 2)
+        })
+
+    results.append(bench_tk_highlight())
+    return results
+
+
+def bench_tk_highlight(frames=2000):
+    """Tag updates on a real Tk Text widget (needs a display)"""
+    try:
+        import tkinter as tk
+        from floating_typing_bot import FloatingTypingBot
+        root = tk.Tk()
+    except Exception as e:
+        return {'group': 'highlight', 'name': 'tk/tags', 'skipped': f"{type(e).__name__}: {e}"}
+
+    text = make_text('bangla', 100 * KB)
+    widget = tk.Text(root)
+    widget.insert('1.0', text)
+
+    # Just the widget and highlight state update_text_highlighting touches
+    bot = FloatingTypingBot.__new__(FloatingTypingBot)
+    bot.text_entry = widget
+    bot.reset_highlighting(text)
+
+    step = max(len(text) // frames, 1)
+    positions = range(0, len(text), step)
+    started = time.perf_counter()
+    for index in positions:
+        bot.update_text_highlighting(index)
+    root.update_idletasks()
+    elapsed = time.perf_counter() - started
+    root.destroy()
+    return {
+        'group': 'highlight',
+        'name': 'tk/tags',
+        'frames': len(positions),
+        'seconds': round(elapsed, 4),
+        'us_per_frame': round(elapsed / len(positions) * 1e6, 2)
+    }
+
+
+def compare(results, baseline_path):
+    """Print the change in throughput/time against an earlier results file"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+
+    print(f"\nChange vs {baseline_path}:")
+    for result in results:
+        old = baseline.get(result['name'])
+        if not old or 'skipped' in result or 'skipped' in old:
+            continue
+        if 'cps' in result and old.get('cps'):
+            change = (result['cps'] / old['cps'] - 1) * 100
+            print(f"  {result['name']:<32} {change:+7.1f}% chars/s")
+        elif old.get('seconds'):
+            change = (result['seconds'] / old['seconds'] - 1) * 100
+            print(f"  {result['name']:<32} {change:+7.1f}% time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the typing engine headlessly")
+    parser.add_argument('--quick', action='store_true', help="only 1 KB and 100 KB inputs")
+    parser.add_argument('--only', default='engine,progress,highlight',
+                        help="comma-separated groups to run (default: all)")
+    parser.add_argument('--duration', type=float, default=2.0,
+                        help="seconds per paced-speed run (default: 2)")
+    parser.add_argument('-o', '--output', default=RESULTS_FILE,
+                        help=f"results file (default: {RESULTS_FILE})")
+    parser.add_argument('--compare', metavar='FILE', help="earlier results file to compare against")
+    parser.add_argument('--label', default='', help="tag stored with the results, e.g. a release version")
+    args = parser.parse_args(argv)
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    groups = set(args.only.split(','))
+    results = []
+
+    if 'engine' in groups:
+        results += bench_engine(sizes, args.duration)
+    if 'progress' in groups:
+        results += bench_progress(sizes)
+    if 'highlight' in groups:
+        results += bench_highlight()
+
+    for result in results:
+        if 'skipped' in result:
+            print(f"{result['name']:<32} skipped ({result['skipped']})")
+        elif 'error_pct' in result:
+            print(f"{result['name']:<32} {result['cps']:>12,.0f} chars/s  {result['seconds']:.3f}s"
+                  f"  pacing {result['error_pct']:+.1f}%")
+        elif 'cps' in result:
+            print(f"{result['name']:<32} {result['cps']:>12,.0f} chars/s  {result['seconds']:.3f}s")
+        else:
+            print(f"{result['name']:<32} {result['seconds']:.3f}s")
+
+    report = {
+        'label': args.label,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# test_pyautogui.py is a manual check that needs a display, not a pytest module
+collect_ignore = ['test_pyautogui.py']
@@ -0,0 +1,229 @@
+"""Local library of saved snippets and documents (SQLite + FTS5)
+
+Bodies are content-addressed: each distinct text is stored once in `bodies`,
+keyed by its SHA-256, and saving the same text again returns the existing
+entry. Listing and searching only touch the small `documents` table and the
+full-text index, so thousands of entries list instantly; a body is read only
+when that document is opened.
+
+If the SQLite build lacks FTS5, search falls back to LIKE matching.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+LIBRARY_FILE = 'documents.db'
+PREVIEW_LENGTH = 120
+PAGE_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL,
+    preview TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_title ON documents (title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS documents_updated ON documents (updated);
+CREATE TABLE IF NOT EXISTS bodies (
+    hash TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS document_tags (
+    tag TEXT NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, document_id)
+);
+"""
+
+# External-content index over a view, so body text isn't stored twice
+FTS_SCHEMA = """
+CREATE VIEW IF NOT EXISTS document_text AS
+    SELECT documents.id AS id, title, tags, body
+    FROM documents JOIN bodies ON bodies.hash = documents.hash;
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, tags, body, content='document_text', content_rowid='id'
+);
+"""
+
+# Columns returned by list/search (no body)
+SUMMARY_COLUMNS = 'id, title, tags, size, preview, created, updated'
+
+
+def content_hash(body):
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def normalize_tags(tags):
+    """'Bangla, Poems' or ['bangla', 'poems'] -> 'bangla poems'"""
+    if isinstance(tags, str):
+        tags = tags.replace(',', ' ').split()
+    return ' '.join(sorted({tag.strip().lower() for tag in tags if tag.strip()}))
+
+
+def default_title(body):
+    first_line = body.strip().split('\n', 1)[0].strip()
+    return first_line[:60] or 'Untitled'
+
+
+def match_query(query):
+    """User search text -> FTS5 query matching every word as a prefix"""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class DocumentLibrary:
+    def __init__(self, path=LIBRARY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA foreign_keys=ON')
+        with self.db:
+            self.db.executescript(SCHEMA)
+        try:
+            with self.db:
+                self.db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def index(self, doc_id, title, tags, body, delete=False):
+        if not self.fts:
+            return
+        command = "'delete', " if delete else ''
+        columns = 'documents_fts, rowid' if delete else 'rowid'
+        self.db.execute(f"INSERT INTO documents_fts ({columns}, title, tags, body) "
+                        f"VALUES ({command}?, ?, ?, ?)", (doc_id, title, tags, body))
+
+    def set_tags(self, doc_id, tags):
+        self.db.execute('DELETE FROM document_tags WHERE document_id = ?', (doc_id,))
+        self.db.executemany('INSERT INTO document_tags (tag, document_id) VALUES (?, ?)',
+                            [(tag, doc_id) for tag in tags.split()])
+
+    def add(self, body, title=None, tags=''):
+        """Save a document; returns (summary dict, created)
+
+        Saving text that is already in the library returns the existing entry
+        (with created=False) instead of storing a duplicate.
+        """
+        digest = content_hash(body)
+        title = (title or '').strip() or default_title(body)
+        tags = normalize_tags(tags)
+        now = time.time()
+
+        with self.lock, self.db:
+            row = self.db.execute(f'SELECT {SUMMARY_COLUMNS} FROM documents WHERE hash = ?',
+                                  (digest,)).fetchone()
+            if row:
+                return dict(row), False
+
+            self.db.execute('INSERT OR IGNORE INTO bodies (hash, body) VALUES (?, ?)', (digest, body))
+            cursor = self.db.execute(
+                'INSERT INTO documents (hash, title, tags, size, preview, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (digest, title, tags, len(body), body[:PREVIEW_LENGTH], now, now))
+            doc_id = cursor.lastrowid
+            self.set_tags(doc_id, tags)
+            self.index(doc_id, title, tags, body)
+            row = self.db.execute(f'SELECT {SUMMARY_COLUMNS} FROM documents WHERE id = ?',
+                                  (doc_id,)).fetchone()
+        return dict(row), True
+
+    def update(self, doc_id, title=None, tags=None):
+        """Rename or retag a document; returns its summary, or None if missing"""
+        with self.lock, self.db:
+            row = self.db.execute('SELECT title, tags, hash FROM documents WHERE id = ?',
+                                  (doc_id,)).fetchone()
+            if not row:
+                return None
+            new_title = row['title'] if title is None else (title.strip() or row['title'])
+            new_tags = row['tags'] if tags is None else normalize_tags(tags)
+
+            if self.fts:
+                body = self.db.execute('SELECT body FROM bodies WHERE hash = ?', (row['hash'],)).fetchone()[0]
+                self.index(doc_id, row['title'], row['tags'], body, delete=True)
+                self.index(doc_id, new_title, new_tags, body)
+            self.db.execute('UPDATE documents SET title = ?, tags = ?, updated = ? WHERE id = ?',
+                            (new_title, new_tags, time.time(), doc_id))
+            self.set_tags(doc_id, new_tags)
+            return dict(self.db.execute(f'SELECT {SUMMARY_COLUMNS} FROM documents WHERE id = ?',
+                                        (doc_id,)).fetchone())
+
+    def delete(self, doc_id):
+        """Remove a document (and its body if nothing else uses it)"""
+        with self.lock, self.db:
+            row = self.db.execute('SELECT title, tags, hash FROM documents WHERE id = ?',
+                                  (doc_id,)).fetchone()
+            if not row:
+                return False
+            if self.fts:
+                body = self.db.execute('SELECT body FROM bodies WHERE hash = ?', (row['hash'],)).fetchone()[0]
+                self.index(doc_id, row['title'], row['tags'], body, delete=True)
+            self.db.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
+            self.db.execute('DELETE FROM bodies WHERE hash = ? AND NOT EXISTS '
+                            '(SELECT 1 FROM documents WHERE hash = ?)', (row['hash'], row['hash']))
+            return True
+
+    def get(self, doc_id):
+        """Full document including its body, or None"""
+        with self.lock:
+            row = self.db.execute(
+                f'SELECT {SUMMARY_COLUMNS}, body FROM documents '
+                'JOIN bodies ON bodies.hash = documents.hash WHERE id = ?', (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def search(self, query='', tag=None, limit=PAGE_SIZE, offset=0):
+        """Document summaries (newest first, or best match first for a query)"""
+        columns = ', '.join(f'documents.{column}' for column in SUMMARY_COLUMNS.split(', '))
+        joins = []
+        where = []
+        params = []
+        order = 'documents.updated DESC'
+
+        if tag:
+            joins.append('JOIN document_tags ON document_tags.document_id = documents.id')
+            where.append('document_tags.tag = ?')
+            params.append(tag.strip().lower())
+
+        query = query.strip()
+        if query and self.fts:
+            joins.append('JOIN documents_fts ON documents_fts.rowid = documents.id')
+            where.append('documents_fts MATCH ?')
+            params.append(match_query(query))
+            order = 'documents_fts.rank'
+        elif query:
+            joins.append('JOIN bodies ON bodies.hash = documents.hash')
+            where.append('(documents.title LIKE ? OR documents.tags LIKE ? OR bodies.body LIKE ?)')
+            params += [f'%{query}%'] * 3
+
+        sql = f'SELECT {columns} FROM documents {" ".join(joins)}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY {order} LIMIT ? OFFSET ?'
+        params += [limit, offset]
+
+        with self.lock:
+            try:
+                rows = self.db.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                # Malformed FTS query - treat as no match
+                return []
+        return [dict(row) for row in rows]
+
+    def tags(self):
+        """All tags with their document counts"""
+        with self.lock:
+            rows = self.db.execute('SELECT tag, COUNT(*) AS count FROM document_tags '
+                                   'GROUP BY tag ORDER BY tag').fetchall()
+        return {row['tag']: row['count'] for row in rows}
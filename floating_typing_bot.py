@@ -1,9 +1,26 @@
 import tkinter as tk
 from tkinter import ttk
-import pyautogui
 import threading
 import time
 import webbrowser
+from typing_engine import TypingEngine, PynputSink
+from progress import ProgressReporter
+from typeability import StrategyCache, analyze
+from run_stats import RunStats, save_report, stats_file_from_env
+from profiling import Profiler
+from graphemes import cluster_bounds, next_clusters
+from document_library import DocumentLibrary
+
+# The mouse backend is loaded on first use, so startup doesn't pay for it
+def cursor_position():
+    from pynput.mouse import Controller
+    return Controller().position
+
+def click_at(x, y):
+    from pynput.mouse import Controller, Button
+    mouse = Controller()
+    mouse.position = (x, y)
+    mouse.click(Button.left)
 
 class RoundedButton(tk.Canvas):
     """Custom rounded button widget"""
@@ -87,22 +104,29 @@ class TypingPreview(tk.Frame):
         self.upcoming_label.pack(side='left')
         
     def update_preview(self, text, current_index):
-        """Update the preview with current typing position"""
+        """Update the preview with current typing position
+        
+        text can be the full string or a text_source.SlidingWindow, since only
+        positions next to current_index are read.
+        """
         if not text or current_index < 0:
             self.past_label.config(text="")
             self.current_label.config(text="")
             self.upcoming_label.config(text="")
             return
         
-        # Get past character (1 char before current)
-        past = text[current_index-1] if current_index > 0 else ""
+        # Work in grapheme clusters so a Bangla conjunct is never split
+        start, end = cluster_bounds(text, current_index)
+        
+        # Get past cluster (1 before current)
+        past = text[cluster_bounds(text, start - 1)[0]:start] if start > 0 else ""
         if past == '\n':
             past = "↵"
         elif past == '\t':
             past = "→"
         
-        # Get current character
-        current = text[current_index] if current_index < len(text) else ""
+        # Get current cluster
+        current = text[start:end]
         if current == '\n':
             current = "↵"
         elif current == '\t':
@@ -110,8 +134,8 @@ class TypingPreview(tk.Frame):
         elif current == ' ':
             current = "␣"
         
-        # Get next 3 characters
-        upcoming = text[current_index+1:current_index+4] if current_index < len(text) else ""
+        # Get next 3 clusters
+        upcoming = next_clusters(text, end, 3)
         upcoming = upcoming.replace('\n', '↵').replace('\t', '→').replace(' ', '␣')
         
         self.past_label.config(text=past)
@@ -138,17 +162,131 @@ class TimeRemaining(tk.Frame):
                                    anchor='center', justify='center')
         self.time_label.pack(expand=True, fill='both')
         
+        # Achieved vs target speed, small underneath
+        self.speed_label = tk.Label(self, text="",
+                                    bg=colors['surface_variant'],
+                                    fg='#757575',
+                                    font=('Segoe UI', 7),
+                                    anchor='center', justify='center')
+        self.speed_label.pack(fill='x')
+        
     def update_time(self, seconds_remaining):
         """Update the time display"""
         minutes = int(seconds_remaining // 60)
         secs = int(seconds_remaining % 60)
         self.time_label.config(text=f"{minutes:02d}m{secs:02d}s")
         
+    def update_speed(self, cps, target_cps=None):
+        """Show achieved (and target, when paced) words per second"""
+        wps = f"{cps / 6:.1f}"
+        if target_cps:
+            wps += f"/{target_cps / 6:.1f}"
+        self.speed_label.config(text=f"{wps} WPS")
+        
     def clear_time(self):
         """Clear the time display"""
         self.time_label.config(text="--m--s")
+        self.speed_label.config(text="")
+
+class LibraryPicker(tk.Toplevel):
+    """Search the document library and pick a document to load
+    
+    Only titles are listed; a body is read from the library when picked.
+    """
+    SEARCH_DELAY_MS = 200
+    
+    def __init__(self, parent, colors, library, on_pick, get_text):
+        super().__init__(parent, bg=colors['surface'])
+        self.colors = colors
+        self.library = library
+        self.on_pick = on_pick
+        self.get_text = get_text
+        self.docs = []
+        self.search_job = None
+        
+        self.title("Document Library")
+        self.attributes('-topmost', True)
+        self.geometry('420x380')
+        
+        self.search_var = tk.StringVar()
+        search = tk.Entry(self, textvariable=self.search_var, bg=colors['surface_variant'],
+                          fg=colors['on_surface'], insertbackground=colors['on_surface'],
+                          font=('Nirmala UI', 10), bd=0, relief='flat')
+        search.pack(fill='x', padx=10, pady=(10, 5), ipady=6)
+        search.focus_set()
+        self.search_var.trace_add('write', lambda *args: self.schedule_search())
+        
+        self.listbox = tk.Listbox(self, bg=colors['surface_variant'], fg=colors['on_surface'],
+                                  selectbackground=colors['primary'], selectforeground=colors['on_primary'],
+                                  font=('Nirmala UI', 10), bd=0, relief='flat', activestyle='none')
+        self.listbox.pack(fill='both', expand=True, padx=10, pady=5)
+        self.listbox.bind('<<ListboxSelect>>', self.show_preview)
+        self.listbox.bind('<Double-Button-1>', lambda e: self.load_selected())
+        self.listbox.bind('<Return>', lambda e: self.load_selected())
+        
+        self.preview = tk.Label(self, text="", bg=colors['surface'], fg=colors['outline'],
+                                font=('Nirmala UI', 9), anchor='w', justify='left', wraplength=400)
+        self.preview.pack(fill='x', padx=10)
+        
+        buttons = tk.Frame(self, bg=colors['surface'])
+        buttons.pack(fill='x', padx=10, pady=10)
+        tk.Button(buttons, text="Load", command=self.load_selected, bg=colors['primary'],
+                  fg=colors['on_primary'], bd=0, padx=12, pady=4, cursor='hand2').pack(side='left')
+        tk.Button(buttons, text="Save current text", command=self.save_current, bg=colors['surface_variant'],
+                  fg=colors['on_surface'], bd=0, padx=12, pady=4, cursor='hand2').pack(side='left', padx=5)
+        
+        self.bind('<Escape>', lambda e: self.destroy())
+        self.search()
+    
+    def schedule_search(self):
+        if self.search_job:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DELAY_MS, self.search)
+    
+    def search(self):
+        """'#tag' words filter by tag, the rest is a full-text search"""
+        self.search_job = None
+        words = self.search_var.get().split()
+        tags = [word[1:] for word in words if word.startswith('#') and len(word) > 1]
+        query = ' '.join(word for word in words if not word.startswith('#'))
+        self.docs = self.library.search(query, tags[0] if tags else None)
+        
+        self.listbox.delete(0, tk.END)
+        for doc in self.docs:
+            self.listbox.insert(tk.END, doc['title'])
+        self.preview.config(text="" if self.docs else "No documents found")
+    
+    def selected(self):
+        selection = self.listbox.curselection()
+        return self.docs[selection[0]] if selection else None
+    
+    def show_preview(self, event=None):
+        doc = self.selected()
+        if doc:
+            tags = ' '.join(f'#{tag}' for tag in doc['tags'].split())
+            self.preview.config(text=f"{doc['size']} chars {tags}\n{doc['preview']}")
+    
+    def load_selected(self):
+        doc = self.selected()
+        if not doc:
+            return
+        full = self.library.get(doc['id'])
+        if full:
+            self.on_pick(full)
+        self.destroy()
+    
+    def save_current(self):
+        text = self.get_text()
+        if not text.strip():
+            return
+        doc, created = self.library.add(text)
+        self.preview.config(text=f"Saved \"{doc['title']}\"" if created else "Already in library")
+        self.search()
 
 class FloatingTypingBot:
+    # Minimum time between progress redraws (~30 FPS)
+    UI_FRAME_MS = 33
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("TypingBot - Bypass Text Pasting")
@@ -195,9 +333,20 @@ class FloatingTypingBot:
         self.is_typing = False
         self.is_paused = False
         self.typing_thread = None
+        self.engine = None
+        self.strategy_cache = StrategyCache()
+        self.library = None
+        # Profiles each run when TYPINGBOT_PROFILE=pstats|collapsed is set
+        self.profiler = Profiler.from_env()
         self.countdown_window = None
         self.current_char_index = 0
-        self.typing_text = ""
+        
+        # Incremental highlighting state
+        self.reset_highlighting("")
+        
+        # UI pump state (redraws at most UI_FRAME_MS apart)
+        self.drawn_index = None
+        self.progress = None
         
         # Make window draggable
         self.dragging = False
@@ -236,6 +385,12 @@ class FloatingTypingBot:
                                       bd=0, command=self.toggle_dark_mode, cursor='hand2')
         self.dark_mode_btn.pack(side='right', padx=5, pady=5, ipadx=8, ipady=2)
         
+        # Document library button
+        self.library_btn = tk.Button(title_bar, text='📚', bg=self.colors['primary'], 
+                                    fg=self.colors['on_primary'], font=('Segoe UI', 14), 
+                                    bd=0, command=self.open_library, cursor='hand2')
+        self.library_btn.pack(side='right', padx=5, pady=5, ipadx=8, ipady=2)
+        
         # Close button
         close_btn = tk.Button(title_bar, text='✕', bg=self.colors['error'], 
                              fg='white', font=('Segoe UI', 14, 'bold'), 
@@ -321,6 +476,10 @@ class FloatingTypingBot:
         self.preview_widget = TypingPreview(control_frame, self.colors, height=40, width=130)
         self.preview_widget.pack(side='left', padx=5, fill='x', expand=True)
         
+        # Estimated time remaining
+        self.time_widget = TimeRemaining(control_frame, self.colors, height=40, width=70)
+        self.time_widget.pack(side='left', padx=(0, 5))
+        
         # Right button (Stop)
         self.stop_btn = RoundedButton(control_frame, "⏹ Stop", self.stop_typing,
                                      self.colors['error'], 'white',
@@ -494,6 +653,8 @@ class FloatingTypingBot:
     def on_escape_key(self, event):
         if self.is_typing:
             self.is_typing = False
+            if self.engine:
+                self.engine.stop()
             self.show_notification("⏹ Typing stopped (ESC)", self.colors['error'])
     
     def update_paste_clear_button(self, event=None):
@@ -530,34 +691,81 @@ class FloatingTypingBot:
         self.update_paste_clear_button()
         self.show_notification("🗑️ Text cleared", self.colors['success'])
     
+    def open_library(self):
+        if self.is_typing:
+            return
+        # Opened on first use, so startup doesn't touch the database
+        if self.library is None:
+            self.library = DocumentLibrary()
+        LibraryPicker(self.root, self.colors, self.library, self.load_document,
+                      lambda: self.text_entry.get("1.0", "end-1c"))
+    
+    def load_document(self, doc):
+        self.text_entry.delete("1.0", tk.END)
+        self.text_entry.insert("1.0", doc['body'])
+        self.update_paste_clear_button()
+        self.show_notification(f"📄 Loaded \"{doc['title']}\"", self.colors['success'])
+    
+    def reset_highlighting(self, text, offset=0):
+        """Start highlighting a new text
+        
+        offset is the number of characters (leading whitespace) the widget
+        has before text begins.
+        """
+        self.typing_text = text
+        self.highlight_length = len(text)
+        self.highlight_offset = offset
+        self.highlight_index = None
+        self.highlight_end = 0
+    
     def update_text_highlighting(self, current_index):
-        """Update text field colors to show typing progress"""
-        # Remove all existing tags
-        self.text_entry.tag_remove('typed', '1.0', tk.END)
-        self.text_entry.tag_remove('current', '1.0', tk.END)
-        self.text_entry.tag_remove('upcoming', '1.0', tk.END)
+        """Update text field colors to show typing progress
         
+        Only the tag boundaries between the previous and the new position are
+        moved, so the cost doesn't grow with the size of the document.
+        """
         if current_index < 0:
             return
         
-        # Apply typed tag (grey) to all text before current position
-        if current_index > 0:
-            self.text_entry.tag_add('typed', '1.0', f'1.{current_index}')
-        
-        # Apply current tag (bright green) to current character
-        text_length = len(self.text_entry.get('1.0', tk.END).strip())
-        if current_index < text_length:
-            self.text_entry.tag_add('current', f'1.{current_index}', f'1.{current_index + 1}')
-        
-        # Apply upcoming tag (yellow) to remaining text
-        if current_index + 1 < text_length:
-            self.text_entry.tag_add('upcoming', f'1.{current_index + 1}', tk.END)
+        # Use character offsets so multi-line text highlights correctly;
+        # positions are in the stripped text, so skip what was stripped
+        skipped = self.highlight_offset
+        
+        def pos(offset):
+            return f'1.0 + {offset + skipped} chars'
+        
+        text_length = self.highlight_length
+        # The current marker covers the whole grapheme cluster
+        start, end = cluster_bounds(self.typing_text, current_index)
+        end = min(end, text_length)
+        
+        if self.highlight_index is None or start < self.highlight_index:
+            # First update (or moved backwards) - lay out all three tags
+            self.clear_text_highlighting()
+            if start > 0 or skipped:
+                self.text_entry.tag_add('typed', '1.0', pos(start))
+            if end < text_length:
+                self.text_entry.tag_add('upcoming', pos(end), tk.END)
+        else:
+            previous = self.highlight_index
+            # Previous current cluster and everything up to the new one is now typed
+            self.text_entry.tag_remove('current', pos(previous), pos(self.highlight_end))
+            self.text_entry.tag_remove('upcoming', pos(previous), pos(end))
+            self.text_entry.tag_add('typed', pos(previous), pos(start))
+        
+        # Apply current tag (bright green) to current cluster
+        if start < text_length:
+            self.text_entry.tag_add('current', pos(start), pos(end))
+        
+        self.highlight_index = start
+        self.highlight_end = end
     
     def clear_text_highlighting(self):
         """Clear all text highlighting"""
         self.text_entry.tag_remove('typed', '1.0', tk.END)
         self.text_entry.tag_remove('current', '1.0', tk.END)
         self.text_entry.tag_remove('upcoming', '1.0', tk.END)
+        self.highlight_index = None
     
     def start_countdown(self):
         self.start_btn.config(state='disabled')
@@ -571,7 +779,8 @@ class FloatingTypingBot:
         self.create_countdown_window()
         
         # Get text before typing
-        text = self.text_entry.get("1.0", tk.END).strip()
+        raw_text = self.text_entry.get("1.0", tk.END)
+        text = raw_text.strip()
         if not text:
             self.show_notification("⚠️ No text entered", self.colors['error'])
             self.cleanup_countdown()
@@ -579,6 +788,13 @@ class FloatingTypingBot:
             self.root.after(0, self.typing_finished)
             return
         
+        # Warn up front about characters that will be skipped
+        report = analyze(text, self.strategy_cache)
+        skipped = len(report['untypeable']) + len(report['known_failures'])
+        if skipped:
+            self.root.after(0, lambda: self.show_notification(
+                f"⚠️ {skipped} character type(s) will be skipped", self.colors['error']))
+        
         for i in range(3, 0, -1):
             if not self.is_typing:
                 self.update_countdown(i)
@@ -590,12 +806,42 @@ class FloatingTypingBot:
         self.root.deiconify()
         
         self.is_typing = True
-        self.typing_text = text
         self.current_char_index = 0
-        x, y = pyautogui.position()
+        self.reset_highlighting(text, len(raw_text) - len(raw_text.lstrip()))
+        x, y = cursor_position()
+        # Created up front so the reporter reads the engine's live estimator
+        self.engine = TypingEngine(PynputSink(), self.strategy_cache, RunStats())
+        self.progress = ProgressReporter(len(text), estimator=self.engine.estimator)
         self.typing_thread = threading.Thread(target=self.type_text, args=(text, x, y), daemon=True)
         self.typing_thread.start()
         
+        # Redraw progress from the main loop at a capped frame rate
+        self.drawn_index = None
+        self.root.after(0, self.ui_pump)
+    
+    def ui_pump(self):
+        """Redraw highlight, preview and time remaining for the latest position
+        
+        Intermediate positions between frames are dropped, so the Tk event
+        queue never floods no matter how fast the typing thread runs.
+        """
+        if not self.is_typing:
+            return
+        
+        index = self.current_char_index
+        if index != self.drawn_index:
+            started = time.perf_counter()
+            self.update_text_highlighting(index)
+            self.preview_widget.update_preview(self.typing_text, index)
+            cps, eta = self.progress.stats(index)
+            if eta is not None:
+                self.time_widget.update_time(eta)
+            self.time_widget.update_speed(cps, self.progress.target_cps())
+            self.drawn_index = index
+            self.engine.stats.record_ui(time.perf_counter() - started)
+        
+        self.root.after(self.UI_FRAME_MS, self.ui_pump)
+        
     def create_countdown_window(self):
         self.countdown_window = tk.Toplevel(self.root)
         self.countdown_window.attributes('-topmost', True)
@@ -659,71 +905,44 @@ class FloatingTypingBot:
         popup.after(2000, popup.destroy)
     
     def type_text(self, text, x, y):
-        from pynput.keyboard import Controller, Key
-        keyboard = Controller()
-        
-        pyautogui.click(x, y)
+        click_at(x, y)
         time.sleep(0.1)
         
         # Get current typing speed (Words Per Second)
         wps = float(self.typing_speed.get())
         
-        # Ensure minimum speed of 1 WPS
-        if wps < 1:
-            wps = 1
+        stats = self.engine.stats
+        stats.begin()
+        typed = 0
         
-        # Calculate delay per character
-        if wps >= 500:
-            # Maximum speed: ultra-fast with nearly zero delay
-            delay = 0.000000001  # 1 nanosecond - essentially instant
-        else:
-            # Normal speed calculation
-            # 1 word = ~6 characters (5 letters + 1 space)
-            chars_per_second = wps * 6.0
-            delay = 1.0 / chars_per_second
-        
-        for i, char in enumerate(text):
-            if not self.is_typing:
-                self.root.after(0, lambda: self.show_notification("⏹ Typing stopped"))
-                break
-            
-            # Wait while paused
-            while self.is_paused and self.is_typing:
-                time.sleep(0.1)
-            
-            if not self.is_typing:
-                break
-            
-            # Update text highlighting in real-time
-            self.current_char_index = i
-            self.root.after(0, lambda idx=i: (
-                self.update_text_highlighting(idx),
-                self.preview_widget.update_preview(self.typing_text, idx)
-            ))
-            
-            if char == '\n':
-                keyboard.press(Key.enter)
-                keyboard.release(Key.enter)
-            elif char == '\t':
-                keyboard.press(Key.tab)
-                keyboard.release(Key.tab)
-            elif char == ' ':
-                keyboard.press(Key.space)
-                keyboard.release(Key.space)
-            else:
-                # Use pynput for ALL characters - it handles Unicode properly
-                # No clipboard needed!
-                try:
-                    keyboard.type(char)
-                except Exception as e:
-                    # Fallback for very special characters
-                    print(f"Could not type character: {char}")
-            
-            time.sleep(delay)
-        
-        # Clear highlighting and preview when done
-        self.root.after(0, self.clear_text_highlighting)
-        self.root.after(0, self.preview_widget.clear_preview)
+        # Maximum speed switches to burst mode (whole runs per keystroke call)
+        error = None
+        try:
+            with self.profiler.session('type_text'):
+                for i, char in self.engine.run(text, wps, burst=wps >= 500):
+                    if not self.is_typing:
+                        break
+                    
+                    # Picked up by ui_pump on the next frame
+                    self.current_char_index = i
+                    typed = i + 1
+        except Exception as e:
+            # Keyboard backend failed mid-run - stop rather than retype anything
+            error = e
+            print(f"Typing failed: {e}")
+        
+        stats.finish(typed)
+        stats_file = stats_file_from_env()
+        if stats_file:
+            save_report(stats.summary(), stats_file)
+        
+        if error is not None:
+            self.root.after(0, lambda: self.show_notification("⚠️ Typing failed", self.colors['error']))
+        elif not self.is_typing:
+            self.root.after(0, lambda: self.show_notification("⏹ Typing stopped"))
+        
+        # Clear highlighting, preview and time in one callback so a pending
+        # ui_pump frame can't redraw in between
         self.root.after(0, self.typing_finished)
         
     def toggle_pause(self):
@@ -732,6 +951,11 @@ class FloatingTypingBot:
             return
         
         self.is_paused = not self.is_paused
+        if self.engine:
+            if self.is_paused:
+                self.engine.pause()
+            else:
+                self.engine.resume()
         
         if self.is_paused:
             # Paused
@@ -746,6 +970,8 @@ class FloatingTypingBot:
     
     def stop_typing(self):
         self.is_typing = False
+        if self.engine:
+            self.engine.stop()
         if self.typing_thread and self.typing_thread.is_alive():
             self.typing_thread.join(timeout=1)
         self.typing_finished()
@@ -761,6 +987,7 @@ class FloatingTypingBot:
         self.text_entry.config(state='normal')
         self.clear_text_highlighting()
         self.preview_widget.clear_preview()
+        self.time_widget.clear_time()
         self.cleanup_countdown()
         
     def run(self):
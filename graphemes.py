@@ -0,0 +1,64 @@
+"""Grapheme-cluster segmentation for Bangla and other combining scripts
+
+A simplified version of the Unicode extended grapheme cluster rules (UAX #29)
+using only the standard library: combining marks, ZWJ/ZWNJ and
+virama-joined conjuncts (e.g. Bangla "ক্ষ") stay with their base character,
+so one visible glyph is typed, highlighted and counted as one unit.
+"""
+import unicodedata
+
+ZWNJ = '\u200c'
+ZWJ = '\u200d'
+JOINERS = (ZWNJ, ZWJ)
+MARK_CATEGORIES = ('Mn', 'Mc', 'Me')
+# Canonical combining class of viramas (Bangla hasanta, Devanagari halant, ...)
+VIRAMA_CLASS = 9
+
+
+def extends_cluster(prev, char):
+    """True if char belongs to the same grapheme cluster as prev"""
+    if char < '\u0300':
+        # Nothing below the combining diacritics block extends a cluster,
+        # except for a character glued on by ZWJ
+        return prev == ZWJ
+    if char in JOINERS or prev == ZWJ:
+        return True
+
+    category = unicodedata.category(char)
+    if category in MARK_CATEGORIES:
+        return True
+
+    # Conjunct: consonant after a virama
+    return category == 'Lo' and unicodedata.combining(prev) == VIRAMA_CLASS
+
+
+def cluster_bounds(text, index):
+    """(start, end) of the cluster containing position index"""
+    length = len(text)
+    if index >= length:
+        return index, index
+
+    start = index
+    while start > 0:
+        try:
+            if not extends_cluster(text[start - 1], text[start]):
+                break
+        except IndexError:
+            # Start of a SlidingWindow reached
+            break
+        start -= 1
+
+    end = index + 1
+    while end < length and extends_cluster(text[end - 1], text[end]):
+        end += 1
+    return start, end
+
+
+def next_clusters(text, start, count):
+    """Text of up to `count` clusters starting at position start"""
+    end = start
+    for _ in range(count):
+        if end >= len(text):
+            break
+        end = cluster_bounds(text, end)[1]
+    return text[start:end]
@@ -0,0 +1,225 @@
+"""Typing job queue for the web API
+
+Every start request becomes a TypingJob with its own ID and engine. Jobs are
+queued and run by a small worker pool that shares one keystroke sink, so only
+one job ever types on the physical keyboard at a time.
+"""
+import itertools
+import queue
+import threading
+import time
+
+from typing_engine import TypingEngine
+from progress import ProgressReporter, ProgressBuffer
+from run_stats import RunStats, save_report
+from graphemes import cluster_bounds, next_clusters
+from text_source import iter_chunks, SlidingWindow
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+PAUSED = 'paused'
+DONE = 'done'
+STOPPED = 'stopped'
+
+# Finished jobs kept for status, stats and late subscribers; older ones are dropped
+KEEP_FINISHED = 20
+
+
+class TypingJob:
+    """A single document to type, with its own pause/stop controls"""
+    def __init__(self, job_id, source, speed, burst, engine, stats_file=None):
+        self.id = job_id
+        # A string or a streaming source such as text_source.FileSource
+        self.source = source
+        self.total = len(source)
+        self.speed = speed
+        self.burst = burst
+        self.engine = engine
+        # Timing instrumentation, shared with the engine
+        self.stats = engine.stats
+        # Where to write the final stats report (None = don't)
+        self.stats_file = stats_file
+        self.index = -1
+        # Only the text around the cursor, for previews of streamed sources
+        self.window = SlidingWindow()
+        self.cancelled = False
+        self.started_at = None
+        self.finished_at = None
+        self.finished_event = threading.Event()
+        # Set once the job leaves the queue
+        self.started_event = threading.Event()
+        # Progress frames for any number of HTTP subscribers
+        self.progress = ProgressBuffer()
+        self.progress.publish(self.to_dict())
+
+    @property
+    def state(self):
+        if self.finished_event.is_set():
+            return STOPPED if self.cancelled or self.index + 1 < self.total else DONE
+        if not self.started_event.is_set():
+            return STOPPED if self.cancelled else QUEUED
+        return PAUSED if self.engine.is_paused else RUNNING
+
+    @property
+    def is_finished(self):
+        return self.finished_event.is_set()
+
+    def run(self):
+        """Type the job's source on the calling thread
+        
+        Progress goes into the job's ring buffer, which never blocks, so slow
+        or disconnected clients can't hold up the typing.
+        """
+        self.started_at = time.perf_counter()
+        self.started_event.set()
+        self.progress.publish(self.to_dict())
+        stats = self.stats
+        stats.begin()
+        
+        # Coalesce per-character progress into a few frames per second
+        reporter = ProgressReporter(self.total, estimator=self.engine.estimator)
+        try:
+            chunks = iter_chunks(self.source)
+            for i, char in self.engine.run_chunks(chunks, self.speed, self.burst, self.window):
+                self.index = i
+                frame = reporter.update(i)
+                if frame:
+                    frame['job_id'] = self.id
+                    published = time.perf_counter()
+                    self.progress.publish(frame)
+                    stats.record_ui(time.perf_counter() - published)
+        finally:
+            # The text isn't needed once typed - don't hold on to large pastes
+            self.source = None
+            self.finished_at = time.perf_counter()
+            stats.finish(self.index + 1)
+            self.finished_event.set()
+            self.publish_summary(reporter.summary(self.index))
+            if self.stats_file:
+                save_report(self.stats_report(), self.stats_file)
+
+    def stats_report(self):
+        """Timing report for the run (live while it is still typing)"""
+        report = self.stats.summary(self.index + 1)
+        report.update(job_id=self.id, state=self.state, speed=self.speed, burst=self.burst)
+        return report
+
+    def publish_summary(self, summary):
+        """Final frame that closes the progress stream"""
+        summary['job_id'] = self.id
+        summary['state'] = self.state
+        self.progress.publish(summary, final=True)
+
+    def pause(self):
+        self.engine.pause()
+        self.progress.publish(self.to_dict())
+
+    def resume(self):
+        self.engine.resume()
+        self.progress.publish(self.to_dict())
+
+    def stop(self):
+        self.cancelled = True
+        self.engine.stop()
+        if not self.started_event.is_set():
+            # Never ran - finish straight away so waiters aren't left hanging
+            self.source = None
+            self.started_event.set()
+            self.finished_event.set()
+            self.publish_summary({
+                'done': True,
+                'index': -1,
+                'total': self.total,
+                'typed': 0,
+                'stopped': True,
+                'elapsed': 0,
+                'cps': 0
+            })
+
+    def wait(self, timeout=None):
+        """Wait for the job to finish; returns True if it did"""
+        return self.finished_event.wait(timeout)
+
+    def preview(self):
+        """The cluster just typed and the next few, read from the window"""
+        index = self.index
+        if index < 0:
+            return ''
+        start, end = cluster_bounds(self.window, index)
+        return self.window[start:end] + next_clusters(self.window, end, 3)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'index': self.index,
+            'total': self.total,
+            'speed': self.speed,
+            'burst': self.burst,
+            'preview': self.preview()
+        }
+
+
+class JobManager:
+    """Queues typing jobs and runs them on a bounded worker pool"""
+    def __init__(self, sink, workers=1, strategy_cache=None, stats_file=None, profiler=None):
+        self.sink = sink
+        self.strategy_cache = strategy_cache
+        # Optional profiling.Profiler wrapped around each job when armed
+        self.profiler = profiler
+        # If set, each finished job's timing report is written here
+        self.stats_file = stats_file
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        # Only one job may drive the keyboard at a time
+        self.keyboard_lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.active = None
+
+        for _ in range(workers):
+            threading.Thread(target=self.worker, daemon=True).start()
+
+    def submit(self, source, speed, burst=False):
+        """Queue a new job and return it"""
+        with self.lock:
+            engine = TypingEngine(self.sink, self.strategy_cache, RunStats())
+            job = TypingJob(str(next(self.ids)), source, speed, burst, engine, self.stats_file)
+            self.jobs[job.id] = job
+            self.prune()
+        self.queue.put(job)
+        return job
+
+    def prune(self):
+        """Forget all but the newest KEEP_FINISHED finished jobs (lock held)"""
+        finished = [job for job in self.jobs.values() if job.is_finished]
+        for job in finished[:-KEEP_FINISHED]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def worker(self):
+        while True:
+            job = self.queue.get()
+            if job.cancelled:
+                continue
+
+            with self.keyboard_lock:
+                self.active = job
+                try:
+                    if self.profiler:
+                        with self.profiler.session(f"job-{job.id}"):
+                            job.run()
+                    else:
+                        job.run()
+                except Exception as e:
+                    print(f"Typing job {job.id} failed: {e}")
+                finally:
+                    self.active = None
@@ -0,0 +1,155 @@
+"""Compile text once into a flat keystroke plan for the typing hot loop
+
+Every grapheme cluster becomes one unsigned int: the opcode in the top bits
+and the code point (or key / cluster index) in the low 21 bits. Special keys,
+untypeable characters and multi-code-point clusters are resolved here, so the
+engine only has to walk the array and dispatch on the opcode.
+"""
+import functools
+import unicodedata
+from array import array
+
+from graphemes import ZWJ, extends_cluster
+
+# Characters that are sent as a key press instead of typed text
+SPECIAL_KEYS = {
+    '\n': 'enter',
+    '\t': 'tab',
+    ' ': 'space'
+}
+KEY_NAMES = ('enter', 'tab', 'space')
+
+# Opcodes
+OP_CHAR = 0  # type the code point in the low bits
+OP_KEY = 1   # press KEY_NAMES[low bits]
+OP_SKIP = 2  # untypeable - nothing is sent (low bits keep the code point)
+OP_NOP = 3   # nothing to send (the '\r' of '\r\n')
+OP_CLUSTER = 4  # type plan.clusters[low bits] (a multi-code-point grapheme cluster)
+
+OP_SHIFT = 21
+VALUE_MASK = (1 << OP_SHIFT) - 1
+
+# Control characters, lone surrogates and unassigned code points
+UNTYPEABLE_CATEGORIES = {'Cc', 'Cs', 'Cn'}
+
+KEY_OPS = {char: (OP_KEY << OP_SHIFT) | KEY_NAMES.index(name) for char, name in SPECIAL_KEYS.items()}
+ENTER_OP = KEY_OPS['\n']
+
+
+class KeystrokePlan:
+    """Compiled form of a piece of text
+
+    ops holds one packed entry per grapheme cluster and ends the text offset
+    just past each entry. breaks lists the entries that aren't typed text
+    (keys, skips), so burst mode can find the end of a typeable run without
+    rescanning the text.
+    """
+    def __init__(self, text, ops, ends, breaks, clusters):
+        self.text = text
+        self.ops = ops
+        self.ends = ends
+        self.breaks = breaks
+        self.clusters = clusters
+
+    def __len__(self):
+        return len(self.ops)
+
+    def start(self, entry):
+        """Text offset where an entry begins"""
+        return self.ends[entry - 1] if entry else 0
+
+    @functools.cached_property
+    def kind_chars(self):
+        """Characters per keystroke kind ('plain', 'unicode', 'key')"""
+        counts = {'plain': 0, 'unicode': 0, 'key': 0}
+        start = 0
+        for packed, end in zip(self.ops, self.ends):
+            kind = entry_kind(packed)
+            if kind:
+                counts[kind] += end - start
+            start = end
+        return counts
+
+    @property
+    def untypeable(self):
+        """Characters that will be skipped"""
+        return [chr(packed & VALUE_MASK) for packed in (self.ops[i] for i in self.breaks)
+                if packed >> OP_SHIFT == OP_SKIP]
+
+
+def entry_kind(packed):
+    """Cost class of a plan entry: 'plain', 'unicode', 'key' or None (free)"""
+    op = packed >> OP_SHIFT
+    if op == OP_CHAR:
+        return 'plain' if packed < 128 else 'unicode'
+    if op == OP_CLUSTER:
+        return 'unicode'
+    if op == OP_KEY:
+        return 'key'
+    return None
+
+
+def classify(char, next_char=''):
+    """Packed plan entry for one character"""
+    packed = KEY_OPS.get(char)
+    if packed is not None:
+        return packed
+
+    if char.isprintable():
+        return ord(char)
+
+    if char == '\r':
+        # '\r\n' is a single line break; a lone '\r' is one too
+        return (OP_NOP << OP_SHIFT) | ord(char) if next_char == '\n' else ENTER_OP
+
+    if unicodedata.category(char) in UNTYPEABLE_CATEGORIES:
+        return (OP_SKIP << OP_SHIFT) | ord(char)
+
+    # Format characters (ZWJ/ZWNJ used in Bangla), non-ASCII spaces etc.
+    return ord(char)
+
+
+@functools.lru_cache(maxsize=16)
+def compile_plan(text, skip=frozenset()):
+    """Compile text into a KeystrokePlan (cached, so repeated runs reuse it)
+
+    skip holds code points already known to be untypeable (see
+    typeability.StrategyCache); they are compiled straight to OP_SKIP.
+    """
+    ops = array('I')
+    ends = array('I')
+    breaks = array('I')
+    clusters = []
+    append = ops.append
+
+    for i, char in enumerate(text):
+        skipped = skip and ord(char) in skip
+
+        # Marks, joiners and conjuncts are merged into the previous entry
+        if (i and not skipped and (char >= '\u0300' or text[i - 1] == ZWJ)
+                and ops[-1] >> OP_SHIFT in (OP_CHAR, OP_CLUSTER)
+                and extends_cluster(text[i - 1], char)):
+            cluster = text[(ends[-2] if len(ends) > 1 else 0):i + 1]
+            if ops[-1] >> OP_SHIFT == OP_CHAR:
+                clusters.append(cluster)
+                ops[-1] = (OP_CLUSTER << OP_SHIFT) | (len(clusters) - 1)
+            else:
+                clusters[-1] = cluster
+            ends[-1] = i + 1
+            continue
+
+        ends.append(i + 1)
+
+        if char.isprintable() and char != ' ' and not skipped:
+            append(ord(char))
+            continue
+
+        if skipped:
+            packed = (OP_SKIP << OP_SHIFT) | ord(char)
+        else:
+            packed = classify(char, text[i + 1:i + 2])
+        if packed >> OP_SHIFT != OP_CHAR:
+            breaks.append(len(ops))
+        append(packed)
+
+    return KeystrokePlan(text, ops, ends, breaks, clusters)
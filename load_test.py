@@ -0,0 +1,123 @@
+"""Load test: control calls must stay responsive during long progress streams
+
+Serves the real Flask app (typing into NullSink, so nothing is typed) on the
+chosen WSGI backend. It starts a long paced /api/start-typing stream, opens
+several SSE watchers on the same job, then hammers status and pause/resume
+calls and finally stops the job. Fails if control latency or the time for
+stop to end the streams goes over budget.
+
+Usage:
+    python load_test.py                       # default backend, 30s job
+    python load_test.py --server werkzeug --watchers 8 --duration 120
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.request
+
+from typing_engine import NullSink
+from job_manager import JobManager
+from wsgi_server import create_server, WAITRESS, WERKZEUG
+
+# 99th percentile budget for a control call while streams are open
+CONTROL_P99_BUDGET = 0.25
+# Time from POST stop to every stream being closed
+STOP_BUDGET = 2.0
+
+
+def request(base, method, path, body=None, timeout=10):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    return urllib.request.urlopen(req, timeout=timeout)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the local API")
+    parser.add_argument('--server', choices=[WAITRESS, WERKZEUG], help="WSGI backend (default: auto)")
+    parser.add_argument('--duration', type=float, default=30, help="length of the typing job in seconds")
+    parser.add_argument('--watchers', type=int, default=4, help="SSE clients watching the job")
+    parser.add_argument('--calls', type=int, default=200, help="status/pause/resume calls to make")
+    args = parser.parse_args(argv)
+
+    import app as web_app
+    web_app.jobs = JobManager(NullSink())
+    server = create_server(web_app.app, backend=args.server)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.port}"
+    print(f"Serving on {base} ({server.backend})")
+
+    # A paced job long enough to outlast the test: 10 WPS = 60 chars/s
+    speed = 10
+    text = 'load test ' * int(args.duration * speed * 6 / 10 + 1)
+    stream = request(base, 'POST', '/api/start-typing', {'text': text, 'speed': speed}, timeout=args.duration + 30)
+    job_id = stream.headers['X-Job-Id']
+
+    closed = {}
+
+    def drain(name, response):
+        for _ in response:
+            pass
+        closed[name] = time.perf_counter()
+
+    threads = [threading.Thread(target=drain, args=('start-typing', stream), daemon=True)]
+    for i in range(args.watchers):
+        response = request(base, 'GET', f'/api/jobs/{job_id}/events', timeout=args.duration + 30)
+        threads.append(threading.Thread(target=drain, args=(f'watcher-{i}', response), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    # Control calls while every stream is open
+    calls = [('GET', f'/api/jobs/{job_id}'), ('POST', f'/api/jobs/{job_id}/pause'),
+             ('GET', f'/api/jobs/{job_id}/stats'), ('POST', f'/api/jobs/{job_id}/resume')]
+    latencies = []
+    for n in range(args.calls):
+        method, path = calls[n % len(calls)]
+        started = time.perf_counter()
+        request(base, method, path, {} if method == 'POST' else None).read()
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+    state = json.load(request(base, 'GET', f'/api/jobs/{job_id}'))['state']
+    if state not in ('running', 'paused'):
+        print(f"FAIL: job finished early ({state}) - raise --duration")
+        return 1
+
+    stop_started = time.perf_counter()
+    request(base, 'POST', f'/api/jobs/{job_id}/stop', {}).read()
+    stop_latency = time.perf_counter() - stop_started
+    for thread in threads:
+        thread.join(STOP_BUDGET + 5)
+    streams_closed = max(closed.values(), default=float('inf')) - stop_started if len(closed) == len(threads) else None
+    server.shutdown()
+
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    print(f"Control calls: {len(latencies)}  p50 {p50 * 1000:.1f} ms  p99 {p99 * 1000:.1f} ms  "
+          f"max {max(latencies) * 1000:.1f} ms")
+    print(f"Stop call: {stop_latency * 1000:.1f} ms")
+    if streams_closed is None:
+        print(f"Streams closed: {len(closed)}/{len(threads)}")
+    else:
+        print(f"All {len(threads)} streams closed {streams_closed * 1000:.0f} ms after stop")
+
+    failures = []
+    if p99 > CONTROL_P99_BUDGET:
+        failures.append(f"control p99 {p99 * 1000:.0f} ms over {CONTROL_P99_BUDGET * 1000:.0f} ms budget")
+    if streams_closed is None or streams_closed > STOP_BUDGET:
+        failures.append("streams did not close in time after stop")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Watch a typing job's progress from the command line
+
+Usage: python monitor.py <job_id> [--url http://127.0.0.1:<port>]
+
+Without --url the running app's port is read from its instance file.
+"""
+import argparse
+import sys
+import urllib.request
+
+from progress import decode_event
+from single_instance import read_instance
+
+
+def watch(base_url, job_id):
+    """Yield frames from a job's Server-Sent Events channel"""
+    url = f"{base_url}/api/jobs/{job_id}/events"
+    with urllib.request.urlopen(url) as response:
+        event = None
+        for raw in response:
+            line = raw.decode('utf-8').rstrip('\n')
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: ') and event:
+                yield decode_event(event, line[6:])
+            elif not line:
+                event = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a TypingBot job")
+    parser.add_argument('job_id')
+    parser.add_argument('--url', help="app address (default: the running instance)")
+    args = parser.parse_args()
+
+    if not args.url:
+        info = read_instance(timeout=0)
+        if not info:
+            print("TypingBot doesn't seem to be running - pass --url")
+            return 1
+        args.url = f"http://127.0.0.1:{info['port']}"
+
+    for frame in watch(args.url, args.job_id):
+        if frame.get('done'):
+            print(f"\n{frame.get('state', 'done')}: typed {frame['typed']}/{frame['total']} "
+                  f"chars in {frame['elapsed']}s ({frame['cps']} chars/s)")
+            break
+
+        if 'state' in frame:
+            print(f"\n[{frame['state']}]")
+            continue
+
+        eta = '--' if frame['eta'] is None else f"{frame['eta']:.1f}s"
+        # 6 characters per word, as in typing_engine.calculate_delay
+        wps = f"{frame['cps'] / 6:.1f}"
+        if frame['target_cps'] is not None:
+            wps += f"/{frame['target_cps'] / 6:.1f}"
+        sys.stdout.write(f"\r{frame['index'] + 1}/{frame['total']}  {frame['cps']} chars/s  {wps} WPS  ETA {eta}   ")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""On-demand profiling of typing runs
+
+A Profiler is armed either for every run (TYPINGBOT_PROFILE=pstats or
+TYPINGBOT_PROFILE=collapsed) or for just the next one (arm(), e.g. from
+POST /api/debug/profile). While disarmed, session() costs one attribute
+check per run, so it can stay wired in permanently.
+
+pstats files open with `python -m pstats` or snakeviz; collapsed-stack files
+(one "frame;frame;frame count" line per stack) feed flamegraph.pl or
+speedscope.
+"""
+import collections
+import contextlib
+import cProfile
+import os
+import sys
+import threading
+import time
+
+PROFILE_ENV = 'TYPINGBOT_PROFILE'
+PROFILE_DIR = 'profiles'
+
+# Output formats
+PSTATS = 'pstats'        # deterministic, cProfile
+COLLAPSED = 'collapsed'  # statistical, stack sampling
+MODES = (PSTATS, COLLAPSED)
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval
+
+    Runs on its own thread and only reads frames, so the profiled thread's
+    timing is barely disturbed (unlike cProfile's per-call hooks).
+    """
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def sample(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """Wraps typing runs in a profiler when armed"""
+    def __init__(self, directory=PROFILE_DIR, mode=None):
+        self.directory = directory
+        # Mode used for every run (from TYPINGBOT_PROFILE), or None
+        self.always = mode if mode in MODES else None
+        # Mode for the next run only, set by arm()
+        self.next_mode = None
+        self.last_file = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, directory=PROFILE_DIR):
+        return cls(directory, os.environ.get(PROFILE_ENV, '').lower())
+
+    @property
+    def armed(self):
+        return bool(self.always or self.next_mode)
+
+    def arm(self, mode=PSTATS):
+        """Profile the next run only"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        with self.lock:
+            self.next_mode = mode
+
+    def disarm(self):
+        with self.lock:
+            self.next_mode = None
+
+    def take_mode(self):
+        """Mode for the run that is starting now (clears a one-shot arm)"""
+        with self.lock:
+            mode = self.next_mode or self.always
+            self.next_mode = None
+        return mode
+
+    def session(self, name):
+        """Context manager around one run; profiles it only if armed"""
+        if not self.armed:
+            return contextlib.nullcontext()
+        mode = self.take_mode()
+        if not mode:
+            return contextlib.nullcontext()
+        return self.profile(name, mode)
+
+    @contextlib.contextmanager
+    def profile(self, name, mode=PSTATS):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        extension = 'pstats' if mode == PSTATS else 'collapsed.txt'
+        path = os.path.join(self.directory, f"{name}-{stamp}.{extension}")
+
+        if mode == PSTATS:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+
+        try:
+            yield path
+        finally:
+            if mode == PSTATS:
+                profiler.disable()
+                profiler.dump_stats(path)
+            else:
+                profiler.stop()
+                profiler.save(path)
+            self.last_file = path
+            print(f"Profile saved to {path}")
+
+    def status(self):
+        return {
+            'armed': self.armed,
+            'mode': self.next_mode or self.always,
+            'always': self.always is not None,
+            'last_file': self.last_file
+        }
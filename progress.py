@@ -0,0 +1,164 @@
+"""Coalesced progress reporting for typing runs"""
+import collections
+import json
+import threading
+import time
+
+
+class ProgressReporter:
+    """Turns per-character progress into at most max_rate frames per second
+
+    A frame is also forced every `every` characters when that is set. Each
+    frame carries the latest index, the measured characters/sec and the ETA,
+    so consumers only do work per frame instead of per character. With an
+    estimator (typing_engine.ThroughputEstimator) cps and ETA come from its
+    smoothed, pause-aware figures instead of the wall-clock average.
+    """
+    def __init__(self, total, max_rate=20, every=None, clock=time.perf_counter, estimator=None):
+        self.total = total
+        self.estimator = estimator
+        self.interval = 1.0 / max_rate
+        self.every = every
+        self.clock = clock
+        self.started = clock()
+        self.last_emit = None
+        self.last_index = -1
+
+    def stats(self, index):
+        """Characters/sec and seconds remaining after typing up to index"""
+        estimator = self.estimator
+        if estimator is not None and estimator.chars:
+            return estimator.cps, estimator.eta(max(self.total - index - 1, 0))
+
+        elapsed = self.clock() - self.started
+        typed = index + 1
+        cps = typed / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - typed) / cps if cps > 0 else None
+        return cps, eta
+
+    def update(self, index):
+        """Record progress; returns a frame dict when one is due, else None"""
+        now = self.clock()
+        due = self.last_emit is None or now - self.last_emit >= self.interval
+        if not due and self.every and index - self.last_index >= self.every:
+            due = True
+        if not due:
+            return None
+
+        self.last_emit = now
+        self.last_index = index
+        cps, eta = self.stats(index)
+        return {
+            'index': index,
+            'total': self.total,
+            'cps': round(cps, 1),
+            'eta': round(eta, 2) if eta is not None else None,
+            'target_cps': self.target_cps()
+        }
+
+    def target_cps(self):
+        """Characters/sec the run is paced for (None in burst mode or if unknown)"""
+        target = self.estimator.target_cps if self.estimator is not None else None
+        return round(target, 1) if target else None
+
+    def summary(self, index):
+        """Final frame sent once the run is over"""
+        elapsed = self.clock() - self.started
+        # Average over the whole run, not the smoothed live figure
+        typed = index + 1
+        cps = typed / elapsed if elapsed > 0 else 0.0
+        return {
+            'done': True,
+            'index': index,
+            'total': self.total,
+            'typed': index + 1,
+            'stopped': index + 1 < self.total,
+            'elapsed': round(elapsed, 3),
+            'cps': round(cps, 1),
+            'target_cps': self.target_cps()
+        }
+
+
+class ProgressBuffer:
+    """Bounded ring buffer of progress frames with sequence numbers
+
+    The typing worker publishes into it without ever blocking on readers.
+    Subscribers read from any sequence number, so a client that reconnects
+    can resume where it left off; a reader that falls more than `size` frames
+    behind just skips to the oldest frame still held (frames carry absolute
+    positions, so nothing is lost but intermediate updates).
+    """
+    def __init__(self, size=256):
+        self.frames = collections.deque(maxlen=size)
+        self.seq = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def publish(self, frame, final=False):
+        """Append a frame; final=True marks the end of the stream"""
+        with self.condition:
+            self.seq += 1
+            frame['seq'] = self.seq
+            self.frames.append(frame)
+            if final:
+                self.closed = True
+            self.condition.notify_all()
+
+    def read(self, since=0, timeout=None):
+        """Frames newer than `since`, waiting up to timeout for one to arrive"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > since or self.closed, timeout)
+            return [frame for frame in self.frames if frame['seq'] > since]
+
+    def subscribe(self, since=0, timeout=1.0):
+        """Yield frames after `since` until the stream is closed"""
+        while True:
+            frames = self.read(since, timeout)
+            for frame in frames:
+                yield frame
+            if frames:
+                since = frames[-1]['seq']
+            elif self.closed:
+                return
+
+
+def encode_event(frame):
+    """Encode a frame as a compact Server-Sent Event
+
+    Progress frames ('p') are five comma-separated integers:
+    index,total,cps,eta_ms,target_cps (eta_ms and target_cps are -1 when
+    unknown or unpaced). Status frames ('s')
+    are state,index,total. Only the final summary ('done') is JSON.
+    """
+    seq = frame['seq']
+    if frame.get('done'):
+        return f"id: {seq}\nevent: done\ndata: {json.dumps(frame)}\n\n"
+
+    if 'cps' in frame:
+        eta = frame['eta']
+        eta_ms = -1 if eta is None else int(eta * 1000)
+        target = frame.get('target_cps')
+        target_cps = -1 if target is None else int(target)
+        data = f"{frame['index']},{frame['total']},{int(frame['cps'])},{eta_ms},{target_cps}"
+        return f"id: {seq}\nevent: p\ndata: {data}\n\n"
+
+    return f"id: {seq}\nevent: s\ndata: {frame['state']},{frame['index']},{frame['total']}\n\n"
+
+
+def decode_event(event, data):
+    """Turn an event name and data line from encode_event back into a frame"""
+    if event == 'done':
+        return json.loads(data)
+
+    if event == 'p':
+        index, total, cps, eta_ms, target_cps = (int(value) for value in data.split(','))
+        return {
+            'index': index,
+            'total': total,
+            'cps': cps,
+            'eta': None if eta_ms < 0 else eta_ms / 1000,
+            'target_cps': None if target_cps < 0 else target_cps
+        }
+
+    state, index, total = data.split(',')
+    return {'state': state, 'index': int(index), 'total': int(total)}
@@ -0,0 +1,185 @@
+"""Low-overhead timing instrumentation for typing runs
+
+Latencies go into fixed-size log-scale histograms instead of per-event lists,
+so recording costs a few integer operations and memory stays constant no
+matter how long the run is. summary() turns them into p50/p95/p99 figures.
+"""
+import json
+import os
+import threading
+import time
+
+# Report written next to user_settings.json when saving is enabled
+STATS_FILE = 'run_stats.json'
+# Set (to anything but 0) to save each run's report to STATS_FILE
+SAVE_STATS_ENV = 'TYPINGBOT_SAVE_STATS'
+
+# A single injection or sleep overshoot longer than this counts as a stall
+STALL_SECONDS = 0.05
+
+
+class Histogram:
+    """Log-linear histogram of durations with ~12% bucket precision
+
+    Durations are bucketed in microseconds: exact below 16us, then 8 buckets
+    per power of two up to ~18 minutes. Anything longer lands in the top bucket.
+    """
+    LINEAR = 16
+    SUB_BITS = 3
+    MAX_EXPONENT = 30
+    SIZE = LINEAR + (MAX_EXPONENT - 3) * (1 << SUB_BITS)
+
+    def __init__(self):
+        self.counts = [0] * self.SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def bucket(cls, micros):
+        if micros < cls.LINEAR:
+            return micros
+        exponent = micros.bit_length() - 1
+        if exponent > cls.MAX_EXPONENT:
+            return cls.SIZE - 1
+        sub = (micros >> (exponent - cls.SUB_BITS)) & ((1 << cls.SUB_BITS) - 1)
+        return cls.LINEAR + (exponent - 4) * (1 << cls.SUB_BITS) + sub
+
+    @classmethod
+    def bucket_value(cls, index):
+        """Midpoint of a bucket, in seconds"""
+        if index < cls.LINEAR:
+            return index / 1e6
+        exponent, sub = divmod(index - cls.LINEAR, 1 << cls.SUB_BITS)
+        exponent += 4
+        width = 1 << (exponent - cls.SUB_BITS)
+        low = (1 << exponent) + sub * width
+        return (low + width / 2) / 1e6
+
+    def add(self, seconds):
+        if seconds < 0:
+            seconds = 0.0
+        self.counts[self.bucket(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Approximate duration (seconds) below which `fraction` of samples fall"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Count, mean, p50/p95/p99 and max in milliseconds"""
+        if not self.count:
+            return {'count': 0}
+
+        def ms(seconds):
+            return round(seconds * 1000, 3)
+
+        return {
+            'count': self.count,
+            'mean': ms(self.total / self.count),
+            'p50': ms(self.percentile(0.50)),
+            'p95': ms(self.percentile(0.95)),
+            'p99': ms(self.percentile(0.99)),
+            'max': ms(self.max)
+        }
+
+
+class RunStats:
+    """Where the time went during one typing run
+
+    inject: time inside the keystroke sink per call (one character, key or
+    burst chunk). overshoot: how late the pacing sleep woke up. ui: time spent
+    in progress callbacks (frame publishing, Tk redraws). Pauses are counted
+    and timed separately and left out of the achieved chars/sec.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.inject = Histogram()
+        self.overshoot = Histogram()
+        self.ui = Histogram()
+        self.pauses = 0
+        self.pause_time = 0.0
+        self.stalls = 0
+        self.chars = 0
+        self.started = None
+        self.finished = None
+
+    def begin(self):
+        self.started = self.clock()
+        self.finished = None
+
+    def finish(self, chars):
+        self.chars = chars
+        self.finished = self.clock()
+
+    def record_inject(self, seconds):
+        self.inject.add(seconds)
+        if seconds > STALL_SECONDS:
+            self.stalls += 1
+
+    def record_overshoot(self, seconds):
+        self.overshoot.add(seconds)
+        if seconds > STALL_SECONDS:
+            self.stalls += 1
+
+    def record_ui(self, seconds):
+        self.ui.add(seconds)
+
+    def record_pause(self, seconds):
+        self.pauses += 1
+        self.pause_time += seconds
+
+    def summary(self, chars=None):
+        """Report for the run so far (or the whole run once finished)"""
+        if chars is None:
+            chars = self.chars
+        if self.started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished or self.clock()) - self.started
+        active = max(elapsed - self.pause_time, 0.0)
+        return {
+            'finished': self.finished is not None,
+            'chars': chars,
+            'elapsed': round(elapsed, 3),
+            'active': round(active, 3),
+            'cps': round(chars / active, 1) if active > 0 else 0.0,
+            'pauses': self.pauses,
+            'pause_time': round(self.pause_time, 3),
+            'stalls': self.stalls,
+            'stall_ms': STALL_SECONDS * 1000,
+            'inject': self.inject.summary(),
+            'overshoot': self.overshoot.summary(),
+            'ui': self.ui.summary()
+        }
+
+
+_save_lock = threading.Lock()
+
+
+def save_report(report, path=STATS_FILE):
+    """Write a run report as JSON (atomically, so readers never see half a file)"""
+    with _save_lock:
+        try:
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Could not save run stats: {e}")
+
+
+def stats_file_from_env():
+    """STATS_FILE if SAVE_STATS_ENV asks for reports to be saved, else None"""
+    return STATS_FILE if os.environ.get(SAVE_STATS_ENV, '') not in ('', '0') else None
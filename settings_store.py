@@ -0,0 +1,143 @@
+"""Cached, write-behind store for user_settings.json
+
+Settings are served from memory; the files are only re-read when their
+modification time changes (e.g. edited by hand). Updates are coalesced and
+written DELAY seconds after the last change, atomically (temp file + rename)
+so a crash can never leave a half-written file.
+
+Large fields (the last typed text can be a whole document) are kept out of
+the JSON file in their own gzip file, rewritten only when they change.
+"""
+import gzip
+import json
+import os
+import threading
+
+SETTINGS_FILE = 'user_settings.json'
+DEFAULT_SETTINGS = {
+    'darkMode': True,  # Dark mode enabled by default
+    'speed': 100,
+    'lastText': ''
+}
+# Fields stored compressed in a file of their own
+LARGE_FIELDS = ('lastText',)
+# Seconds to wait for more changes before writing
+DELAY = 1.0
+
+
+def atomic_write(path, data):
+    """Replace path with data (bytes) in one step"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class SettingsStore:
+    def __init__(self, path=SETTINGS_FILE, defaults=DEFAULT_SETTINGS, delay=DELAY):
+        self.path = path
+        self.defaults = defaults
+        self.delay = delay
+        self.settings = None
+        # Modification times of the files as last read or written by us
+        self.mtimes = {}
+        # Large fields changed since the last write
+        self.dirty_fields = set()
+        self.dirty = False
+        self.timer = None
+        self.lock = threading.RLock()
+
+    def field_path(self, field):
+        base, _ = os.path.splitext(self.path)
+        return f"{base}.{field}.gz"
+
+    def files(self):
+        return [self.path] + [self.field_path(field) for field in LARGE_FIELDS]
+
+    def is_stale(self):
+        return self.settings is None or any(mtime(path) != self.mtimes.get(path) for path in self.files())
+
+    def load(self):
+        settings = dict(self.defaults)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                settings.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+        for field in LARGE_FIELDS:
+            path = self.field_path(field)
+            if os.path.exists(path):
+                try:
+                    with gzip.open(path, 'rt', encoding='utf-8') as f:
+                        settings[field] = f.read()
+                except (OSError, EOFError):
+                    pass
+            elif field in settings and settings[field] != self.defaults.get(field):
+                # Older settings file with the field inline - move it out on next write
+                self.dirty_fields.add(field)
+
+        self.settings = settings
+        self.mtimes = {path: mtime(path) for path in self.files()}
+
+    def get(self):
+        """Current settings (a copy)"""
+        with self.lock:
+            # Unsaved changes in memory win over the files
+            if not self.dirty and self.is_stale():
+                self.load()
+            return dict(self.settings)
+
+    def update(self, changes):
+        """Merge changes in and schedule a write"""
+        with self.lock:
+            if self.settings is None or (not self.dirty and self.is_stale()):
+                self.load()
+            for key, value in changes.items():
+                if self.settings.get(key) == value:
+                    continue
+                self.settings[key] = value
+                if key in LARGE_FIELDS:
+                    self.dirty_fields.add(key)
+                self.dirty = True
+
+            if self.dirty or self.dirty_fields:
+                self.schedule()
+
+    def schedule(self):
+        """(Re)start the write-behind timer"""
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """Write pending changes now"""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if self.settings is None or not (self.dirty or self.dirty_fields):
+                return
+
+            small = {key: value for key, value in self.settings.items() if key not in LARGE_FIELDS}
+            try:
+                for field in self.dirty_fields:
+                    path = self.field_path(field)
+                    atomic_write(path, gzip.compress(str(self.settings.get(field, '')).encode('utf-8')))
+                atomic_write(self.path, json.dumps(small, indent=4, ensure_ascii=False).encode('utf-8'))
+            except OSError as e:
+                print(f"Could not save settings: {e}")
+                return
+
+            self.dirty = False
+            self.dirty_fields.clear()
+            self.mtimes = {path: mtime(path) for path in self.files()}
@@ -0,0 +1,97 @@
+"""Single-instance guard and hand-off to the running app
+
+The first launch holds an OS-level lock on LOCK_FILE (released automatically
+if the process dies, so a crash never leaves a stale lock) and publishes its
+ephemeral port and a random token in INSTANCE_FILE. A second launch finds the
+lock taken, sends its text to the running instance over localhost and exits
+instead of starting another server and window.
+"""
+import json
+import os
+import secrets
+import time
+import urllib.request
+
+LOCK_FILE = 'typingbot.lock'
+# Kept separate from the lock file: Windows won't let other processes read
+# a locked byte range
+INSTANCE_FILE = 'typingbot_instance.json'
+HANDOFF_PATH = '/api/instance/handoff'
+TOKEN_HEADER = 'X-Instance-Token'
+
+
+class InstanceLock:
+    """Exclusive, non-blocking lock held for the lifetime of the process"""
+    def __init__(self, path=LOCK_FILE, info_path=INSTANCE_FILE):
+        self.path = path
+        self.info_path = info_path
+        self.file = None
+        self.token = secrets.token_hex(16)
+
+    def acquire(self):
+        """True if this is the only running instance"""
+        self.file = open(self.path, 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.file.close()
+            self.file = None
+            return False
+        return True
+
+    def publish(self, port):
+        """Tell later launches where to find this instance"""
+        info = {'pid': os.getpid(), 'port': port, 'token': self.token}
+        temp_path = self.info_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(temp_path, self.info_path)
+
+    def release(self):
+        if self.file is None:
+            return
+        try:
+            os.remove(self.info_path)
+        except OSError:
+            pass
+        self.file.close()
+        self.file = None
+
+
+def read_instance(path=INSTANCE_FILE, timeout=5.0):
+    """Port and token of the running instance, waiting briefly while it starts"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+
+def hand_off(text, path=INSTANCE_FILE):
+    """Send text to the running instance; returns True if it was delivered"""
+    info = read_instance(path)
+    if not info:
+        return False
+
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{info['port']}{HANDOFF_PATH}",
+        data=json.dumps({'text': text}).encode('utf-8'),
+        headers={'Content-Type': 'application/json', TOKEN_HEADER: info['token']},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status == 200
+    except OSError as e:
+        print(f"Could not reach the running instance: {e}")
+        return False
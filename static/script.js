@@ -6,6 +6,10 @@ class TypingBot {
         this.isPaused = false;
         this.currentText = '';
         this.typingSpeed = 100;
+        this.jobId = null;
+        // Last text the server has, so unchanged text isn't re-sent
+        this.savedText = '';
+        this.saveTimer = null;
 
         this.initializeElements();
         this.attachEventListeners();
@@ -28,6 +32,7 @@ class TypingBot {
 
         // Preview elements
         this.livePreview = document.getElementById('livePreview');
+        this.previewStatus = document.getElementById('previewStatus');
         this.prevChar = document.getElementById('prevChar');
         this.currentChar = document.getElementById('currentChar');
         this.nextChars = document.getElementById('nextChars');
@@ -37,6 +42,14 @@ class TypingBot {
         this.countdownModal = document.getElementById('countdownModal');
         this.countdownNumber = document.getElementById('countdownNumber');
         this.notificationToast = document.getElementById('notificationToast');
+
+        // Document library
+        this.libraryBtn = document.getElementById('libraryBtn');
+        this.saveDocBtn = document.getElementById('saveDocBtn');
+        this.libraryModal = document.getElementById('libraryModal');
+        this.librarySearch = document.getElementById('librarySearch');
+        this.libraryList = document.getElementById('libraryList');
+        this.libraryClose = document.getElementById('libraryClose');
     }
 
     attachEventListeners() {
@@ -53,6 +66,18 @@ class TypingBot {
         // Input buttons
         this.pasteBtn.addEventListener('click', () => this.pasteFromClipboard());
         this.clearBtn.addEventListener('click', () => this.clearText());
+        this.libraryBtn.addEventListener('click', () => this.openLibrary());
+        this.saveDocBtn.addEventListener('click', () => this.saveToLibrary());
+
+        // Library picker
+        this.libraryClose.addEventListener('click', () => this.closeLibrary());
+        this.libraryModal.addEventListener('click', (e) => {
+            if (e.target === this.libraryModal) this.closeLibrary();
+        });
+        this.librarySearch.addEventListener('input', () => {
+            clearTimeout(this.searchTimer);
+            this.searchTimer = setTimeout(() => this.searchLibrary(), 200);
+        });
 
         // Control buttons
         this.startBtn.addEventListener('click', () => this.startTyping());
@@ -64,10 +89,19 @@ class TypingBot {
             this.saveSettings();
         });
 
+        // Don't lose a change still waiting in the debounce timer
+        window.addEventListener('pagehide', () => {
+            clearTimeout(this.saveTimer);
+            const body = new Blob([JSON.stringify(this.pendingSettings())], { type: 'application/json' });
+            navigator.sendBeacon('/api/settings', body);
+        });
+
         // Keyboard shortcuts
         document.addEventListener('keydown', (e) => {
             if (e.key === 'Escape' && this.isTyping) {
                 this.stopTyping();
+            } else if (e.key === 'Escape' && this.libraryModal.style.display === 'flex') {
+                this.closeLibrary();
             }
         });
     }
@@ -81,7 +115,6 @@ class TypingBot {
 
         this.saveSettings();
         this.showNotification(this.isDarkMode ? '🌙 Dark mode enabled' : '☀️ Light mode enabled');
-        this.saveSettings(); // Save to file
     }
 
     async loadSettings() {
@@ -92,6 +125,7 @@ class TypingBot {
             this.typingSpeed = settings.speed || 100;
             this.isDarkMode = settings.darkMode || false;
             this.currentText = settings.lastText || '';
+            this.savedText = this.currentText;
         } catch (error) {
             console.error('Failed to load settings:', error);
             // Use defaults
@@ -101,12 +135,28 @@ class TypingBot {
         }
     }
 
-    async saveSettings() {
+    saveSettings() {
+        // Coalesce bursts of changes (e.g. typing in the text box) into one request
+        clearTimeout(this.saveTimer);
+        this.saveTimer = setTimeout(() => this.flushSettings(), 500);
+    }
+
+    pendingSettings() {
         const settings = {
             speed: this.typingSpeed,
-            darkMode: this.isDarkMode,
-            lastText: this.textInput.value
+            darkMode: this.isDarkMode
         };
+        // The text can be a whole document - only send it when it changed
+        const text = this.textInput.value;
+        if (text !== this.savedText) {
+            settings.lastText = text;
+        }
+        return settings;
+    }
+
+    async flushSettings() {
+        clearTimeout(this.saveTimer);
+        const settings = this.pendingSettings();
 
         try {
             await fetch('/api/settings', {
@@ -116,6 +166,7 @@ class TypingBot {
                 },
                 body: JSON.stringify(settings)
             });
+            if ('lastText' in settings) this.savedText = settings.lastText;
         } catch (error) {
             console.error('Failed to save settings:', error);
         }
@@ -136,12 +187,6 @@ class TypingBot {
         }
     }
 
-    saveSettings() {
-        localStorage.setItem('typingSpeed', this.typingSpeed);
-        localStorage.setItem('darkMode', this.isDarkMode);
-        localStorage.setItem('lastText', this.textInput.value);
-    }
-
     async pasteFromClipboard() {
         try {
             const text = await navigator.clipboard.readText();
@@ -153,6 +198,109 @@ class TypingBot {
         }
     }
 
+    async saveToLibrary() {
+        const body = this.textInput.value;
+        if (!body.trim()) {
+            this.showNotification('⚠️ Nothing to save', 'error');
+            return;
+        }
+
+        try {
+            const response = await fetch('/api/documents', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ body })
+            });
+            const doc = await response.json();
+            if (!response.ok) throw new Error(doc.error);
+            this.showNotification(doc.duplicate ? '📚 Already in library' : `📚 Saved "${doc.title}"`);
+        } catch (error) {
+            this.showNotification('⚠️ Could not save to library', 'error');
+        }
+    }
+
+    openLibrary() {
+        if (this.isTyping) return;
+        this.libraryModal.style.display = 'flex';
+        this.librarySearch.value = '';
+        this.librarySearch.focus();
+        this.searchLibrary();
+    }
+
+    closeLibrary() {
+        this.libraryModal.style.display = 'none';
+    }
+
+    async searchLibrary() {
+        // "#tag" words filter by tag, the rest is a full-text search
+        const words = this.librarySearch.value.trim().split(/\s+/).filter(Boolean);
+        const tag = words.find((word) => word.startsWith('#'));
+        const params = new URLSearchParams({
+            q: words.filter((word) => !word.startsWith('#')).join(' ')
+        });
+        if (tag && tag.length > 1) params.set('tag', tag.slice(1));
+
+        // Only summaries are listed; a body is fetched when it's picked
+        const requested = params.toString();
+        this.lastSearch = requested;
+        try {
+            const response = await fetch(`/api/documents?${requested}`);
+            const docs = await response.json();
+            // A slower, older search must not overwrite newer results
+            if (this.lastSearch === requested) this.renderLibrary(docs);
+        } catch (error) {
+            console.error('Library search failed:', error);
+        }
+    }
+
+    renderLibrary(docs) {
+        const fragment = document.createDocumentFragment();
+        for (const doc of docs) {
+            const item = document.createElement('li');
+            const title = document.createElement('div');
+            title.className = 'doc-title';
+            title.textContent = doc.title;
+            const meta = document.createElement('div');
+            meta.className = 'doc-meta';
+            meta.textContent = [`${doc.size} chars`, ...doc.tags.split(' ').filter(Boolean).map((t) => `#${t}`)].join(' · ');
+            const preview = document.createElement('div');
+            preview.className = 'doc-preview';
+            preview.textContent = doc.preview;
+            item.append(title, meta, preview);
+            item.addEventListener('click', () => this.loadDocument(doc.id));
+            fragment.appendChild(item);
+        }
+        if (!docs.length) {
+            const empty = document.createElement('li');
+            empty.className = 'doc-meta';
+            empty.textContent = 'No documents found';
+            fragment.appendChild(empty);
+        }
+        this.libraryList.replaceChildren(fragment);
+    }
+
+    async loadDocument(id) {
+        try {
+            const response = await fetch(`/api/documents/${id}`);
+            const doc = await response.json();
+            if (!response.ok) throw new Error(doc.error);
+            this.textInput.value = doc.body;
+            this.saveSettings();
+            this.closeLibrary();
+            this.showNotification(`📄 Loaded "${doc.title}"`);
+        } catch (error) {
+            this.showNotification('⚠️ Could not load document', 'error');
+        }
+    }
+
+    receiveText(text) {
+        // Text handed over by another launch of the app
+        if (this.textInput.disabled) return;
+        this.textInput.value = text;
+        this.saveSettings();
+        this.showNotification('📥 Text received');
+    }
+
     clearText() {
         this.textInput.value = '';
         this.saveSettings();
@@ -168,10 +316,50 @@ class TypingBot {
         }
 
         this.currentText = text;
+        await this.checkTypeability(text);
         await this.showCountdown();
         await this.performTyping();
     }
 
+    async checkTypeability(text) {
+        // Warn up front about characters that will be skipped
+        try {
+            const response = await fetch('/api/analyze', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ text })
+            });
+            const report = await response.json();
+            if (report.known_failures.length && await this.retryKnownFailures(report.known_failures)) {
+                report.known_failures = [];
+            }
+            const skipped = report.untypeable.length + report.known_failures.length;
+            if (skipped) {
+                this.showNotification(`⚠️ ${skipped} character type(s) can't be typed and will be skipped`, 'error');
+            }
+        } catch (error) {
+            console.error('Failed to analyze text:', error);
+        }
+    }
+
+    async retryKnownFailures(chars) {
+        // Failures depend on the keyboard layout, so offer to try them again
+        if (!confirm(`${chars.join(' ')} could not be typed on an earlier run and will be skipped.\n\nTry typing them again?`)) {
+            return false;
+        }
+        try {
+            const response = await fetch('/api/strategy-cache', {
+                method: 'DELETE',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ chars })
+            });
+            return response.ok;
+        } catch (error) {
+            console.error('Failed to clear strategy cache:', error);
+            return false;
+        }
+    }
+
     async showCountdown() {
         return new Promise((resolve) => {
             this.countdownModal.style.display = 'flex';
@@ -206,39 +394,23 @@ class TypingBot {
         this.textInput.disabled = true;
         this.livePreview.style.display = 'block';
 
-        // Start streaming
+        // Queue the job, then watch its progress over Server-Sent Events
         try {
-            const response = await fetch('/api/start-typing', {
+            const response = await fetch('/api/jobs', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     text: this.currentText,
-                    speed: this.typingSpeed
+                    speed: this.typingSpeed,
+                    // Max speed uses burst mode (batched keystrokes)
+                    burst: Number(this.typingSpeed) >= 500
                 }),
             });
+            const job = await response.json();
+            if (!response.ok) throw new Error(job.error);
 
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-            let buffer = '';
-
-            while (true) {
-                const { value, done } = await reader.read();
-                if (done) break;
-
-                buffer += decoder.decode(value, { stream: true });
-
-                const lines = buffer.split('\n');
-                buffer = lines.pop();
-
-                for (const line of lines) {
-                    if (line.trim()) {
-                        try {
-                            const data = JSON.parse(line);
-                            this.updatePreview(data);
-                        } catch (e) { }
-                    }
-                }
-            }
+            this.jobId = job.job_id;
+            await this.watchJob(job.job_id);
 
             this.finishTyping();
         } catch (error) {
@@ -247,54 +419,182 @@ class TypingBot {
         }
     }
 
+    watchJob(jobId) {
+        // Resolves when the job's final summary arrives (or the channel closes).
+        // EventSource reconnects on its own and resumes from Last-Event-ID.
+        return new Promise((resolve) => {
+            const source = new EventSource(`/api/jobs/${jobId}/events`);
+
+            // Progress: index,total,cps,eta_ms,target_cps (-1 = unknown)
+            source.addEventListener('p', (event) => {
+                const [index, total, cps, etaMs, targetCps] = event.data.split(',').map(Number);
+                this.updatePreview({
+                    index, total, cps,
+                    eta: etaMs < 0 ? null : etaMs / 1000,
+                    targetCps: targetCps < 0 ? null : targetCps
+                });
+            });
+
+            // Status change: state,index,total
+            source.addEventListener('s', (event) => {
+                const [, index, total] = event.data.split(',');
+                this.updatePreview({ index: Number(index), total: Number(total) });
+            });
+
+            source.addEventListener('done', (event) => {
+                this.updatePreview(JSON.parse(event.data));
+                source.close();
+                resolve();
+            });
+
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) resolve();
+            };
+        });
+    }
+
     updatePreview(data) {
-        const { index, char, total } = data;
+        // Frames are coalesced server-side, so this runs a few times per second
+        const { index, total, cps, eta, targetCps, done } = data;
+        if (index < 0) return;
 
-        // Update live preview
-        this.prevChar.textContent = index > 0 ? this.currentText[index - 1] : '';
-        this.currentChar.textContent = char || '';
-        this.nextChars.textContent = this.currentText.substring(index + 1, index + 4);
+        // Update live preview (whole grapheme clusters, so conjuncts aren't split)
+        const text = this.currentText;
+        const [start, end] = this.clusterBounds(index);
+        const prevStart = start > 0 ? this.clusterBounds(start - 1)[0] : start;
+        let nextEnd = end;
+        for (let i = 0; i < 3 && nextEnd < text.length; i++) {
+            nextEnd = this.clusterBounds(nextEnd)[1];
+        }
+        this.prevChar.textContent = text.substring(prevStart, start);
+        this.currentChar.textContent = text.substring(start, end);
+        this.nextChars.textContent = text.substring(end, nextEnd);
 
         // Update progress
         const progress = ((index + 1) / total) * 100;
         this.progressFill.style.width = `${progress}%`;
 
+        // Update speed and time remaining
+        if (done) {
+            this.previewStatus.textContent = `Typed ${data.typed} chars in ${data.elapsed}s`;
+        } else if (cps) {
+            const remaining = eta === null ? '--' : `${Math.ceil(eta)}s`;
+            // Achieved vs requested words/sec (6 chars per word, as on the server)
+            let wps = `${(cps / 6).toFixed(1)}`;
+            if (targetCps) wps += `/${(targetCps / 6).toFixed(1)}`;
+            this.previewStatus.textContent = `Typing... ${Math.round(cps)} chars/s (${wps} WPS) · ${remaining} left`;
+        }
+
         // Highlight text in input
         this.highlightTextInput(index);
     }
 
     highlightTextInput(currentIndex) {
+        // The overlay is built once per run; each update only moves boundaries
+        if (!this.overlay) {
+            this.createOverlay();
+        }
+
         const text = this.currentText;
-        const before = text.substring(0, currentIndex);
-        const current = text[currentIndex] || '';
-        const after = text.substring(currentIndex + 1);
-
-        let overlay = document.getElementById('textOverlay');
-        if (!overlay) {
-            overlay = document.createElement('div');
-            overlay.id = 'textOverlay';
-            overlay.className = 'text-overlay';
-            this.textInput.parentElement.appendChild(overlay);
-            this.textInput.style.color = 'transparent';
-            this.textInput.style.caretColor = '#66BB6A';
+        const [start, clusterEnd] = this.clusterBounds(currentIndex);
+        const index = Math.min(start, text.length);
+        const end = Math.min(clusterEnd, text.length);
+
+        if (this.highlightRanges) {
+            // CSS Custom Highlight API: just move the range endpoints
+            const { typed, current, upcoming } = this.highlightRanges;
+            typed.setEnd(this.overlayText, index);
+            current.setStart(this.overlayText, index);
+            current.setEnd(this.overlayText, end);
+            upcoming.setStart(this.overlayText, end);
+        } else {
+            // Fallback: three pre-split text nodes, shifted by the delta only
+            const { typed, current, upcoming } = this.overlayNodes;
+            if (index < this.highlightIndex) {
+                typed.data = text.substring(0, index);
+                upcoming.data = text.substring(end);
+            } else {
+                typed.appendData(text.substring(this.highlightIndex, index));
+                upcoming.deleteData(0, end - this.highlightEnd);
+            }
+            current.data = text.substring(index, end);
         }
 
-        const beforeSpan = `<span style="color: #9E9E9E">${this.escapeHtml(before)}</span>`;
-        const currentSpan = `<span style="color: #66BB6A; font-weight: bold">${this.escapeHtml(current)}</span>`;
-        const afterSpan = `<span style="color: #FFA726">${this.escapeHtml(after)}</span>`;
+        this.highlightIndex = index;
+        this.highlightEnd = end;
+    }
 
-        overlay.innerHTML = beforeSpan + currentSpan + afterSpan;
+    clusterBounds(index) {
+        // [start, end) of the grapheme cluster containing index
+        if (this.segmenter === undefined) {
+            this.segmenter = (window.Intl && Intl.Segmenter)
+                ? new Intl.Segmenter(undefined, { granularity: 'grapheme' })
+                : null;
+        }
+        if (!this.segmenter) return [index, index + 1];
+
+        // Only segment a small slice around the index, so cost stays constant
+        const from = Math.max(0, index - 16);
+        const segment = this.segmenter
+            .segment(this.currentText.substring(from, index + 16))
+            .containing(index - from);
+        if (!segment) return [index, index + 1];
+        return [from + segment.index, from + segment.index + segment.segment.length];
     }
 
-    escapeHtml(text) {
-        const div = document.createElement('div');
-        div.textContent = text;
-        return div.innerHTML.replace(/\n/g, '<br>');
+    createOverlay() {
+        const text = this.currentText;
+
+        const overlay = document.createElement('div');
+        overlay.id = 'textOverlay';
+        overlay.className = 'text-overlay';
+
+        if (window.CSS && CSS.highlights && window.Highlight) {
+            // One text node for the whole document, coloured with ranges
+            this.overlayText = document.createTextNode(text);
+            overlay.appendChild(this.overlayText);
+
+            this.highlightRanges = {};
+            for (const name of ['typed', 'current', 'upcoming']) {
+                const range = new Range();
+                range.setStart(this.overlayText, 0);
+                range.setEnd(this.overlayText, name === 'upcoming' ? text.length : 0);
+                this.highlightRanges[name] = range;
+                CSS.highlights.set(`typing-${name}`, new Highlight(range));
+            }
+        } else {
+            this.overlayNodes = {};
+            for (const name of ['typed', 'current', 'upcoming']) {
+                const span = document.createElement('span');
+                span.className = `overlay-${name}`;
+                const node = document.createTextNode(name === 'upcoming' ? text : '');
+                span.appendChild(node);
+                overlay.appendChild(span);
+                this.overlayNodes[name] = node;
+            }
+        }
+
+        this.highlightIndex = 0;
+        this.highlightEnd = 0;
+        this.overlay = overlay;
+        this.textInput.parentElement.appendChild(overlay);
+        this.textInput.style.color = 'transparent';
+        this.textInput.style.caretColor = '#66BB6A';
     }
 
     clearInputHighlight() {
-        const overlay = document.getElementById('textOverlay');
-        if (overlay) overlay.remove();
+        if (this.overlay) {
+            this.overlay.remove();
+            this.overlay = null;
+        }
+        if (this.highlightRanges) {
+            for (const name of ['typed', 'current', 'upcoming']) {
+                CSS.highlights.delete(`typing-${name}`);
+            }
+            this.highlightRanges = null;
+        }
+        this.overlayNodes = null;
+        this.overlayText = null;
         this.textInput.style.color = '';
         this.textInput.style.caretColor = '';
     }
@@ -310,12 +610,20 @@ class TypingBot {
             this.showNotification('▶ Typing resumed');
         }
 
-        fetch('/api/toggle-pause', { method: 'POST' });
+        if (this.jobId) {
+            fetch(`/api/jobs/${this.jobId}/${this.isPaused ? 'pause' : 'resume'}`, { method: 'POST' });
+        } else {
+            fetch('/api/toggle-pause', { method: 'POST' });
+        }
     }
 
     stopTyping() {
         this.isTyping = false;
-        fetch('/api/stop-typing', { method: 'POST' });
+        if (this.jobId) {
+            fetch(`/api/jobs/${this.jobId}/stop`, { method: 'POST' });
+        } else {
+            fetch('/api/stop-typing', { method: 'POST' });
+        }
         this.showNotification('⏹ Typing stopped');
         this.finishTyping();
     }
@@ -323,12 +631,14 @@ class TypingBot {
     finishTyping() {
         this.isTyping = false;
         this.isPaused = false;
+        this.jobId = null;
 
         this.startBtn.disabled = false;
         this.pauseBtn.disabled = true;
         this.stopBtn.disabled = true;
         this.textInput.disabled = false;
         this.livePreview.style.display = 'none';
+        this.previewStatus.textContent = 'Typing...';
         this.progressFill.style.width = '0%';
 
         this.clearInputHighlight();
@@ -372,6 +682,8 @@ class TypingBot {
 
 document.addEventListener('DOMContentLoaded', async () => {
     const app = new TypingBot();
+    // Reachable from the desktop shell (pywebview evaluate_js)
+    window.typingBot = app;
     // Wait for settings to load before applying
     await app.loadSettings();
     app.applySettings();
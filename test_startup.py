@@ -0,0 +1,70 @@
+"""Import-time budget for the app entry points
+
+Each module is imported in a fresh interpreter. The heavy input and GUI
+backends (pyautogui/Pillow, pynput, pywebview) must not be loaded at import
+time, and the import must stay within IMPORT_BUDGET seconds.
+
+Run with pytest or directly: python test_startup.py
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_BUDGET = 1.0
+HEAVY_MODULES = ['pyautogui', 'PIL', 'pynput', 'webview']
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MISSING_MODULE = re.compile(r"ModuleNotFoundError: No module named '([^'.]+)")
+
+
+def probe(module):
+    """(seconds, heavy modules loaded) for importing module in a new interpreter"""
+    result = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                            capture_output=True, text=True, cwd=HERE)
+    if result.returncode != 0:
+        missing = MISSING_MODULE.search(result.stderr)
+        if missing and not os.path.exists(os.path.join(HERE, missing.group(1) + '.py')):
+            # A third-party dependency (e.g. Flask) isn't installed - nothing to measure
+            pytest.skip(f"{module}: {missing.group(1)} is not installed")
+        raise AssertionError(f"importing {module} failed:\n{result.stderr}")
+    data = json.loads(result.stdout)
+    return data['seconds'], data['loaded']
+
+
+def check(module):
+    seconds, loaded = probe(module)
+    print(f"{module}: {seconds * 1000:.0f} ms, heavy modules loaded: {loaded or 'none'}")
+    assert not loaded, f"{module} imports {loaded} at startup"
+    assert seconds < IMPORT_BUDGET, f"{module} took {seconds:.2f}s to import (budget {IMPORT_BUDGET}s)"
+
+
+def test_engine_import():
+    check('typing_engine')
+
+
+def test_floating_bot_import():
+    check('floating_typing_bot')
+
+
+def test_app_import():
+    check('app')
+
+
+if __name__ == '__main__':
+    test_engine_import()
+    test_floating_bot_import()
+    test_app_import()
+    print("Startup budget OK.")
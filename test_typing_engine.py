@@ -0,0 +1,69 @@
+"""Engine regression tests against RecordingSink (no display needed)
+
+Run with pytest or directly: python test_typing_engine.py
+"""
+import threading
+
+from typing_engine import TypingEngine, RecordingSink
+from text_source import iter_chunks
+
+
+def type_chunks(text, chunk_size, burst=False):
+    """(sink, yielded indexes) for text streamed in chunk_size pieces"""
+    engine = TypingEngine(RecordingSink())
+    indexes = [i for i, _ in engine.run_chunks(iter_chunks(text, chunk_size), 500, burst)]
+    return engine.sink, indexes
+
+
+def test_crlf_split_across_chunks():
+    for burst in (False, True):
+        sink, indexes = type_chunks('ab\r\ncd', 3, burst)
+        assert sink.output == 'ab\ncd'
+        assert indexes[-1] == len('ab\r\ncd') - 1
+
+
+def test_chunk_ending_with_crlf():
+    for burst in (False, True):
+        sink, _ = type_chunks('ab\r\ncd', 4, burst)
+        assert sink.output == 'ab\ncd'
+    sink, _ = type_chunks('x' * 65534 + '\r\ntail', 64 * 1024, True)
+    assert sink.output == 'x' * 65534 + '\ntail'
+
+
+def test_lone_cr_at_end_of_input():
+    sink, _ = type_chunks('ab\r', 3)
+    assert sink.output == 'ab\n'
+
+
+def test_cluster_split_across_chunks():
+    for burst in (False, True):
+        sink, indexes = type_chunks('ক্ষমা', 2, burst)
+        assert sink.events == [('text', 'ক্ষ'), ('text', 'মা')]
+        assert indexes[-1] == len('ক্ষমা') - 1
+
+
+def test_pause_survives_chunk_boundary():
+    engine = TypingEngine(RecordingSink())
+    run = engine.run_chunks(iter_chunks('abcdef', 3), 500)
+    # Last index of the first chunk ('c' is held back with the next one)
+    assert [next(run)[0], next(run)[0]] == [0, 1]
+    engine.pause()
+
+    rest = threading.Thread(target=lambda: list(run))
+    rest.start()
+    rest.join(0.2)
+    assert engine.is_paused and rest.is_alive()
+    assert engine.sink.output == 'ab'
+
+    engine.resume()
+    rest.join(5)
+    assert engine.sink.output == 'abcdef'
+
+
+if __name__ == '__main__':
+    test_crlf_split_across_chunks()
+    test_chunk_ending_with_crlf()
+    test_lone_cr_at_end_of_input()
+    test_cluster_split_across_chunks()
+    test_pause_survives_chunk_boundary()
+    print("Engine tests OK.")
@@ -0,0 +1,130 @@
+"""Streaming text sources so huge documents never have to be held in memory"""
+import codecs
+import mmap
+import os
+
+from graphemes import cluster_bounds
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FileSource:
+    """UTF-8 file read through mmap and decoded a chunk at a time"""
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.length = None
+
+    def blocks(self):
+        """Raw byte blocks of the file"""
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for start in range(0, len(data), self.chunk_size):
+                    yield data[start:start + self.chunk_size]
+
+    def __iter__(self):
+        # Incremental decoding copes with characters split across blocks
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for block in self.blocks():
+            chunk = decoder.decode(block)
+            if chunk:
+                yield chunk
+
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def __len__(self):
+        """Number of characters, as iteration will yield them
+
+        Counted by decoding a block at a time, so invalid bytes (each replaced
+        with U+FFFD) are counted exactly as they will be typed.
+        """
+        if self.length is None:
+            self.length = sum(map(len, self))
+        return self.length
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """Yield text chunks from a string, file object or iterable of strings"""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+def align_chunks(chunks):
+    """Re-cut text chunks so none ends inside a grapheme cluster or '\r\n'
+
+    Each chunk is compiled into a keystroke plan on its own, so the last
+    cluster of a chunk is held back and sent with the next one: a conjunct
+    split across chunks would otherwise be injected in two calls, and a '\r'
+    would be typed as a line break of its own before the '\n' that follows.
+    """
+    carry = ''
+    for chunk in chunks:
+        chunk = carry + chunk
+        if not chunk:
+            continue
+        start = cluster_bounds(chunk, len(chunk) - 1)[0]
+        if chunk[start] == '\n' and start > 0 and chunk[start - 1] == '\r':
+            # '\r\n' is one line break but two clusters - keep them together
+            start -= 1
+        chunk, carry = chunk[:start], chunk[start:]
+        if chunk:
+            yield chunk
+    if carry:
+        yield carry
+
+
+class SlidingWindow:
+    """Keeps only the text around the typing cursor
+
+    Indexing uses absolute character positions, so a window can stand in for
+    the full string in previews as long as only positions near the cursor are
+    read. Text further than `keep` characters behind the cursor is dropped.
+    """
+    def __init__(self, keep=64):
+        self.keep = keep
+        # (absolute offset of buffer[0], buffer) - swapped as one so readers
+        # on other threads never see a mismatched pair
+        self.state = (0, '')
+
+    def push(self, chunk):
+        """Append upcoming text"""
+        base, buffer = self.state
+        self.state = (base, buffer + chunk)
+
+    def advance(self, cursor):
+        """Drop text that is more than `keep` characters behind cursor"""
+        base, buffer = self.state
+        drop = cursor - self.keep - base
+        if drop > 0:
+            self.state = (base + drop, buffer[drop:])
+
+    def __len__(self):
+        base, buffer = self.state
+        return base + len(buffer)
+
+    def __getitem__(self, key):
+        base, buffer = self.state
+        if isinstance(key, slice):
+            start = max((key.start or 0) - base, 0)
+            stop = None if key.stop is None else max(key.stop - base, 0)
+            return buffer[start:stop]
+
+        index = key - base
+        if index < 0:
+            raise IndexError("position is no longer in the window")
+        return buffer[index]
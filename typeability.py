@@ -0,0 +1,169 @@
+"""Pre-flight typeability analysis and the per-character strategy cache
+
+analyze() scans text before typing starts and reports what will need the
+slow Unicode injection path, combining sequences and characters that can't
+be typed at all. StrategyCache remembers, across runs, which characters the
+keyboard backend couldn't type, so known failures are compiled straight to
+skips instead of being discovered deep into a long run.
+
+Whether a character can be typed depends on the keyboard layout, so a
+failure only counts under the layout it was seen with, and is retried after
+RETRY_AFTER seconds in any case. clear() forgets failures on request.
+"""
+import collections
+import json
+import os
+import sys
+import threading
+import time
+import unicodedata
+
+from keystroke_plan import classify, OP_SHIFT, OP_SKIP
+
+CACHE_FILE = 'strategy_cache.json'
+
+# Strategies
+SKIP = 'skip'  # sink reported it untypeable - don't try again
+
+# Seconds before a recorded failure is tried again
+RETRY_AFTER = 24 * 60 * 60
+
+
+def keyboard_layout():
+    """Identifier of the foreground window's keyboard layout, or None if unknown
+
+    Only Windows exposes this cheaply; elsewhere failures just expire.
+    """
+    if sys.platform != 'win32':
+        return None
+    try:
+        import ctypes
+        user32 = ctypes.windll.user32
+        thread = user32.GetWindowThreadProcessId(user32.GetForegroundWindow(), None)
+        return f"{user32.GetKeyboardLayout(thread) & 0xFFFFFFFF:08x}"
+    except Exception:
+        return None
+
+
+class StrategyCache:
+    """Persistent map of code point -> injection strategy learned from earlier runs
+
+    Each entry records the strategy, the keyboard layout and when it was seen.
+    """
+    def __init__(self, path=CACHE_FILE, retry_after=RETRY_AFTER, layout=keyboard_layout):
+        self.path = path
+        self.retry_after = retry_after
+        self.layout = layout
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Entries from older versions (a bare strategy string) count as expired
+            self.entries = {int(code): entry if isinstance(entry, dict) else {'strategy': entry, 'time': 0}
+                            for code, entry in data.items()}
+        except:
+            self.entries = {}
+
+    def save(self):
+        """Write the cache if anything changed (atomically)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {str(code): entry for code, entry in self.entries.items()}
+            self.dirty = False
+
+        try:
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Could not save strategy cache: {e}")
+
+    def is_current(self, entry, layout, now):
+        """True if an entry applies to the current layout and hasn't expired"""
+        return entry.get('layout') == layout and now - entry.get('time', 0) < self.retry_after
+
+    def get(self, char):
+        """Strategy for char, or None if unknown, expired or from another layout"""
+        entry = self.entries.get(ord(char))
+        if entry and self.is_current(entry, self.layout(), time.time()):
+            return entry['strategy']
+        return None
+
+    def record(self, char, strategy):
+        with self.lock:
+            self.entries[ord(char)] = {'strategy': strategy, 'layout': self.layout(), 'time': time.time()}
+            self.dirty = True
+
+    def skipped(self):
+        """Code points known to fail under the current layout, for compile_plan"""
+        layout = self.layout()
+        now = time.time()
+        return frozenset(code for code, entry in self.entries.items()
+                         if entry['strategy'] == SKIP and self.is_current(entry, layout, now))
+
+    def failures(self):
+        """Characters currently being skipped"""
+        return sorted(chr(code) for code in self.skipped())
+
+    def clear(self, chars=None):
+        """Forget recorded failures (all, or just chars) so they are tried again"""
+        with self.lock:
+            if chars is None:
+                self.entries.clear()
+            else:
+                for char in chars:
+                    self.entries.pop(ord(char), None)
+            self.dirty = True
+        self.save()
+
+
+def script_of(char):
+    """Rough script name from the Unicode character name ('BENGALI', 'LATIN', ...)"""
+    name = unicodedata.name(char, '')
+    return name.split(' ', 1)[0] if name else 'UNKNOWN'
+
+
+def analyze(text, cache=None):
+    """Report how a text will be typed before typing starts"""
+    # Count distinct characters once (in C), then classify each only once
+    counts = collections.Counter(text)
+
+    report = {
+        'total': len(text),
+        'ascii': 0,
+        'unicode': 0,
+        'combining': 0,
+        'untypeable': [],
+        'known_failures': [],
+        'scripts': {}
+    }
+    scripts = collections.Counter()
+
+    for char, count in counts.items():
+        if char.isascii():
+            report['ascii'] += count
+        else:
+            # Not on the keyboard layout: typed through the slow Unicode path
+            report['unicode'] += count
+            scripts[script_of(char)] += count
+
+        # Vowel signs, viramas etc. combine with the previous character
+        if unicodedata.category(char) in ('Mn', 'Mc'):
+            report['combining'] += count
+
+        if classify(char) >> OP_SHIFT == OP_SKIP:
+            report['untypeable'].append(char)
+        elif cache and cache.get(char) == SKIP:
+            report['known_failures'].append(char)
+
+    report['scripts'] = dict(scripts)
+    return report
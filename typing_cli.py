@@ -0,0 +1,85 @@
+"""Headless command-line typing - no Tk window or browser needed
+
+Text is streamed from a file or stdin in bounded chunks, so multi-megabyte
+inputs never have to be loaded whole.
+
+Usage:
+    python typing_cli.py notes.txt --speed 50
+    type notes.txt | python typing_cli.py --burst --delay 5
+    python typing_cli.py big.txt --dry-run
+"""
+import argparse
+import io
+import sys
+import time
+
+from typing_engine import TypingEngine, PynputSink, PyautoguiSink, NullSink
+from text_source import FileSource, iter_chunks
+
+SINKS = {
+    'pynput': PynputSink,
+    'pyautogui': PyautoguiSink
+}
+
+
+def open_input(path, chunk_size):
+    """Chunked text from stdin or a memory-mapped file"""
+    if path == '-':
+        return iter_chunks(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), chunk_size)
+    return iter_chunks(FileSource(path, chunk_size))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Type text from a file or stdin into the focused window")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="file to type ('-' or omitted for stdin)")
+    parser.add_argument('--speed', type=float, default=100,
+                        help="typing speed in words per second (default: 100)")
+    parser.add_argument('--burst', action='store_true',
+                        help="max speed, sending whole runs of characters per keystroke call")
+    parser.add_argument('--delay', type=float, default=3,
+                        help="seconds to wait before typing, to focus the target window (default: 3)")
+    parser.add_argument('--sink', choices=sorted(SINKS), default='pynput',
+                        help="keyboard backend (default: pynput)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="run the engine without sending any keystrokes")
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024,
+                        help="characters read per chunk (default: 65536)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    sink = NullSink() if args.dry_run else SINKS[args.sink]()
+    engine = TypingEngine(sink)
+
+    if args.delay > 0 and not args.dry_run:
+        print(f"Typing starts in {args.delay:g}s - focus the target window...", file=sys.stderr)
+        time.sleep(args.delay)
+
+    typed = 0
+    started = time.perf_counter()
+    last_report = started
+
+    try:
+        for i, char in engine.run_chunks(open_input(args.input, args.chunk_size), args.speed, args.burst):
+            typed = i + 1
+            now = time.perf_counter()
+            if now - last_report >= 0.5:
+                last_report = now
+                cps = typed / (now - started)
+                sys.stderr.write(f"\rTyped {typed} chars ({cps:.0f} chars/s)   ")
+                sys.stderr.flush()
+    except KeyboardInterrupt:
+        engine.stop()
+        print("\nStopped.", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    cps = typed / elapsed if elapsed > 0 else 0
+    print(f"\rTyped {typed} chars in {elapsed:.2f}s ({cps:.0f} chars/s)   ", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,587 @@
+"""Shared keystroke engine used by both the web app and the floating window"""
+import collections
+import threading
+import time
+
+from keystroke_plan import (SPECIAL_KEYS, KEY_NAMES, OP_SHIFT, VALUE_MASK,
+                            compile_plan, entry_kind)
+from text_source import align_chunks
+from typeability import SKIP
+
+
+class UntypeableCharacter(Exception):
+    """Raised by a sink when a character in a run cannot be typed"""
+    def __init__(self, index, char):
+        super().__init__(f"Could not type: {char}")
+        self.index = index
+        self.char = char
+
+
+class KeystrokeSink:
+    """Base class for anything the engine can send keystrokes to"""
+    def press_key(self, name):
+        """Press and release a named key ('enter', 'tab', 'space')"""
+        raise NotImplementedError
+
+    def type_text(self, text):
+        """Type a run of characters
+
+        Raise UntypeableCharacter with the offset of the failing character;
+        everything before it must already have been typed.
+        """
+        raise NotImplementedError
+
+
+class PynputSink(KeystrokeSink):
+    """Types into the focused window using pynput (handles Unicode properly)
+
+    pynput is only imported on the first keystroke, so creating a sink at
+    startup costs nothing.
+    """
+    def __init__(self):
+        self._keyboard = None
+        self.keys = None
+        self.lock = threading.Lock()
+
+    @property
+    def keyboard(self):
+        if self._keyboard is None:
+            with self.lock:
+                if self._keyboard is None:
+                    from pynput.keyboard import Controller, Key
+                    self.keys = {
+                        'enter': Key.enter,
+                        'tab': Key.tab,
+                        'space': Key.space
+                    }
+                    self._keyboard = Controller()
+        return self._keyboard
+
+    def press_key(self, name):
+        keyboard = self.keyboard
+        key = self.keys[name]
+        keyboard.press(key)
+        keyboard.release(key)
+
+    def type_text(self, text):
+        keyboard = self.keyboard
+        try:
+            keyboard.type(text)
+        except keyboard.InvalidCharacterException as e:
+            index, char = e.args
+            raise UntypeableCharacter(index, char)
+
+
+class PyautoguiSink(KeystrokeSink):
+    """Types into the focused window using pyautogui (ASCII only)"""
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def press_key(self, name):
+        self.pyautogui.press(name)
+
+    def type_text(self, text):
+        self.pyautogui.write(text)
+
+
+class RecordingSink(KeystrokeSink):
+    """In-memory sink for tests and benchmarks - no display needed"""
+    def __init__(self):
+        self.events = []
+
+    def press_key(self, name):
+        self.events.append(('key', name))
+
+    def type_text(self, text):
+        self.events.append(('text', text))
+
+    @property
+    def output(self):
+        """Text as it would appear in the target window"""
+        keys = {name: char for char, name in SPECIAL_KEYS.items()}
+        return ''.join(keys[value] if kind == 'key' else value for kind, value in self.events)
+
+    def clear(self):
+        self.events = []
+
+
+class NullSink(KeystrokeSink):
+    """Discards keystrokes and only counts them - for dry runs on huge inputs"""
+    def __init__(self):
+        self.keys = 0
+        self.chars = 0
+        self.calls = 0
+
+    def press_key(self, name):
+        self.keys += 1
+        self.calls += 1
+
+    def type_text(self, text):
+        self.chars += len(text)
+        self.calls += 1
+
+
+# Speeds at or above this are typed flat out with no pacing
+MAX_WPS = 500
+
+
+def calculate_delay(wps):
+    """Delay between characters for a speed in words per second"""
+    # Ensure minimum speed of 1 WPS
+    if wps < 1:
+        wps = 1
+
+    if wps >= MAX_WPS:
+        # Maximum speed: ultra-fast with nearly zero delay
+        return 0.000000001
+
+    # 1 word = ~6 characters (5 letters + 1 space)
+    chars_per_second = wps * 6.0
+    return 1.0 / chars_per_second
+
+
+class PacingScheduler:
+    """Drift-free pacing: sleeps until absolute deadlines instead of a fixed delay
+
+    Time spent inside the keystroke sink counts towards the interval, so the
+    achieved speed matches the requested one. After a stall the scheduler skips
+    sleeping until it has caught up, but never by more than max_lag seconds so a
+    long hiccup doesn't turn into a burst. Delays shorter than the OS timer
+    resolution accumulate until they are worth one real sleep.
+    """
+    # Shortest sleep the OS can honour reliably (Windows timers are ~1-2ms at best)
+    TIMER_RESOLUTION = 0.002
+
+    def __init__(self, interval, max_lag=1.0, clock=time.perf_counter, sleep=time.sleep):
+        self.interval = interval
+        self.max_lag = max_lag
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = None
+
+    def reset(self):
+        """Start a new schedule from now (call after pauses)"""
+        self.deadline = self.clock()
+
+    def wait(self):
+        """Wait until the next character is due
+
+        Returns how late the sleep woke up (seconds), or None if it didn't sleep.
+        """
+        if self.deadline is None:
+            self.reset()
+
+        self.deadline += self.interval
+        now = self.clock()
+        remaining = self.deadline - now
+
+        if remaining < -self.max_lag:
+            # Too far behind to catch up - drop the backlog instead of bursting
+            self.deadline = now - self.max_lag
+        elif remaining >= self.TIMER_RESOLUTION:
+            self.sleep(remaining)
+            return max(self.clock() - self.deadline, 0.0)
+        return None
+
+
+class ChunkSizer:
+    """Adapts the burst chunk size to the measured injection latency
+
+    Chunks are sized so one injection call takes about target_latency, which
+    keeps stop/pause checks and progress updates responsive at full speed.
+    """
+    MIN_CHUNK = 8
+    MAX_CHUNK = 1024
+
+    def __init__(self, target_latency=0.005, size=32):
+        self.target_latency = target_latency
+        self.size = size
+
+    def record(self, char_count, seconds):
+        """Feed back how long an injection call of char_count characters took"""
+        if char_count < 1 or seconds <= 0:
+            return
+
+        ideal = self.target_latency / (seconds / char_count)
+        # Smooth out noisy measurements
+        size = int((self.size + ideal) / 2)
+        self.size = max(self.MIN_CHUNK, min(self.MAX_CHUNK, size))
+
+
+class ThroughputEstimator:
+    """Live characters/sec and ETA from exponentially weighted moving averages
+
+    Seconds per character are tracked separately for plain ASCII, Unicode-path
+    characters (non-ASCII and clusters) and special keys, since they cost very
+    different amounts to inject. The ETA weights those costs by the mix of the
+    text still to type. Time spent paused is left out of every measurement.
+    """
+    KINDS = ('plain', 'unicode', 'key')
+
+    def __init__(self, alpha=0.05, clock=time.perf_counter):
+        self.alpha = alpha
+        self.clock = clock
+        self.target_cps = None
+        # EWMA seconds per character, per kind and overall
+        self.cost = dict.fromkeys(self.KINDS)
+        self.overall = None
+        self.last = None
+        self.active_time = 0.0
+        self.chars = 0
+        # Character mix of the plan being typed, and how much of it is done
+        self.plan_chars = dict.fromkeys(self.KINDS, 0)
+        self.typed_chars = dict.fromkeys(self.KINDS, 0)
+
+    def begin_plan(self, plan):
+        self.plan_chars = plan.kind_chars
+        self.typed_chars = dict.fromkeys(self.KINDS, 0)
+
+    def resume(self):
+        """Restart the clock (after a pause or between runs)"""
+        self.last = self.clock()
+
+    def record(self, kind, chars=1):
+        """Record that chars characters of one kind were just sent"""
+        now = self.clock()
+        if self.last is None:
+            self.last = now
+            return
+        elapsed = now - self.last
+        self.last = now
+        if kind is None or chars < 1:
+            return
+
+        per_char = elapsed / chars
+        # Weighted per character (as if updated once for each), so a
+        # multi-character cluster counts for as much as its characters
+        weight = self.alpha if chars == 1 else 1.0 - (1.0 - self.alpha) ** chars
+        cost = self.cost[kind]
+        self.cost[kind] = per_char if cost is None else cost + weight * (per_char - cost)
+        overall = self.overall
+        self.overall = per_char if overall is None else overall + weight * (per_char - overall)
+
+        self.active_time += elapsed
+        self.chars += chars
+        self.typed_chars[kind] += chars
+
+    @property
+    def cps(self):
+        """Smoothed achieved characters per second"""
+        if not self.overall:
+            return 0.0
+        return 1.0 / self.overall
+
+    def seconds_per_char(self):
+        """Expected cost of one more character, given the remaining mix"""
+        remaining = {kind: max(self.plan_chars[kind] - self.typed_chars[kind], 0) for kind in self.KINDS}
+        mix_total = sum(remaining.values()) or sum(self.plan_chars.values())
+        if not mix_total or self.overall is None:
+            return self.overall
+
+        mix = remaining if sum(remaining.values()) else self.plan_chars
+        return sum(mix[kind] * (self.cost[kind] or self.overall) for kind in self.KINDS) / mix_total
+
+    def eta(self, remaining_chars):
+        """Seconds left to type remaining_chars characters, or None if unknown"""
+        per_char = self.seconds_per_char()
+        if per_char is None:
+            if not self.target_cps:
+                return None
+            per_char = 1.0 / self.target_cps
+        return remaining_chars * per_char
+
+
+class TypingEngine:
+    """Types text into a keystroke sink at a given speed
+
+    Pause, resume and stop are threading.Event based: a paused run blocks
+    without polling, resume wakes it immediately and stop also interrupts
+    the sleep between keystrokes. They are safe to call from any thread.
+    """
+    def __init__(self, sink, strategy_cache=None, stats=None):
+        self.sink = sink
+        # Optional typeability.StrategyCache shared across runs
+        self.strategy_cache = strategy_cache
+        # Optional run_stats.RunStats; timing is only taken when one is given
+        self.stats = stats
+        self.running = False
+        # Characters that couldn't be typed, reported once per run
+        self.untyped = collections.Counter()
+        # Plan opcode -> handler (see keystroke_plan)
+        self.handlers = (self.type_code, self.press_code, self.skip_code, self.nop_code,
+                         self.type_cluster)
+        # Cluster strings of the plan being typed (for OP_CLUSTER)
+        self.clusters = []
+        # Live throughput / ETA, kept across the chunks of a run
+        self.estimator = ThroughputEstimator()
+        self.stop_event = threading.Event()
+        # Set while not paused
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+
+    @property
+    def is_typing(self):
+        return self.running and not self.stop_event.is_set()
+
+    @property
+    def is_paused(self):
+        return not self.resume_event.is_set()
+
+    def type_code(self, value):
+        try:
+            self.sink.type_text(chr(value))
+        except UntypeableCharacter:
+            # Only a definite "can't type this" is remembered; anything else
+            # (e.g. a transient OS error) propagates and is never cached
+            self.untyped[chr(value)] += 1
+            if self.strategy_cache:
+                self.strategy_cache.record(chr(value), SKIP)
+
+    def press_code(self, value):
+        self.sink.press_key(KEY_NAMES[value])
+
+    def skip_code(self, value):
+        self.untyped[chr(value)] += 1
+
+    def nop_code(self, value):
+        pass
+
+    def type_cluster(self, value):
+        """Type a whole grapheme cluster (base + marks/conjuncts) in one call"""
+        self.send_chunk(self.clusters[value])
+
+    def send_chunk(self, chunk):
+        """Send a run of plain characters in as few sink calls as possible
+
+        Any error other than UntypeableCharacter propagates: the sink may
+        already have typed part of the run, so retrying it would type that
+        part twice.
+        """
+        while chunk:
+            try:
+                self.sink.type_text(chunk)
+                return
+            except UntypeableCharacter as e:
+                # Skip the bad character and carry on with the rest of the run
+                self.untyped[e.char] += 1
+                if self.strategy_cache:
+                    self.strategy_cache.record(e.char, SKIP)
+                chunk = chunk[e.index + 1:]
+
+    def wait_if_paused(self):
+        """Block while paused; returns True if a pause actually happened"""
+        if not self.is_paused:
+            return False
+
+        # stop() also sets resume_event, so this can't block forever
+        paused_at = time.perf_counter()
+        self.resume_event.wait()
+        if self.stats:
+            self.stats.record_pause(time.perf_counter() - paused_at)
+        return True
+
+    def run(self, text, wps, burst=False):
+        """Type text, yielding (index, char) after each character
+
+        In burst mode runs of plain characters are sent in a single sink call
+        with no delay, and (index, char) is yielded once per run.
+        """
+        self.begin_run()
+        try:
+            yield from self.type_chunk(text, wps, burst)
+        finally:
+            self.end_run()
+
+    def begin_run(self):
+        self.running = True
+        self.estimator.resume()
+
+    def end_run(self):
+        """Once per run, however many chunks it was typed in"""
+        self.running = False
+        self.resume_event.set()
+        self.report_untyped()
+        if self.strategy_cache:
+            self.strategy_cache.save()
+
+    def type_chunk(self, text, wps, burst):
+        """Type one chunk of text within a run"""
+        # Set by run_paced; burst and maximum speed are unpaced
+        self.estimator.target_cps = None
+        if burst:
+            yield from self.run_burst(text)
+        else:
+            yield from self.run_paced(text, wps)
+
+    def report_untyped(self):
+        """Print untypeable characters once, instead of once per keystroke"""
+        if self.untyped:
+            chars = ', '.join(f"{char!r} x{count}" for char, count in self.untyped.items())
+            print(f"Could not type: {chars}")
+            self.untyped.clear()
+
+    def run_chunks(self, chunks, wps, burst=False, window=None):
+        """Type an iterable of text chunks, yielding (index, char) across all of them
+
+        Only the current and next chunk are held at a time, so inputs can be
+        streamed from a file or pipe without loading them whole. If a
+        SlidingWindow is given it is kept filled around the cursor for previews.
+        """
+        chunks = align_chunks(chunks)
+        current = next(chunks, None)
+        if window is not None and current:
+            window.push(current)
+
+        # One run across all chunks, so a pause isn't cleared at a chunk boundary
+        self.begin_run()
+        try:
+            offset = 0
+            while current is not None:
+                if self.stop_event.is_set():
+                    break
+
+                # Read one chunk ahead so the preview can see past the chunk end
+                upcoming = next(chunks, None)
+                if window is not None:
+                    window.advance(offset)
+                    if upcoming:
+                        window.push(upcoming)
+
+                for i, char in self.type_chunk(current, wps, burst):
+                    yield offset + i, char
+                offset += len(current)
+                current = upcoming
+        finally:
+            self.end_run()
+
+    def compile(self, text):
+        """Keystroke plan for text, skipping characters known to fail"""
+        skip = self.strategy_cache.skipped() if self.strategy_cache else frozenset()
+        return compile_plan(text, skip)
+
+    def run_paced(self, text, wps):
+        """Type one grapheme cluster per tick, yielding (last index, cluster)"""
+        plan = self.compile(text)
+        ends = plan.ends
+        handlers = self.handlers
+        self.clusters = plan.clusters
+        estimator = self.estimator
+        estimator.begin_plan(plan)
+        stats = self.stats
+        clock = time.perf_counter
+
+        interval = calculate_delay(float(wps))
+        if wps < MAX_WPS and len(plan):
+            # Pacing is one cluster per tick, but progress counts characters,
+            # so the target is this text's characters per tick times the tick rate
+            estimator.target_cps = len(text) / len(plan) / interval
+
+        # Sleeping on the stop event lets stop() cut the inter-key delay short
+        scheduler = PacingScheduler(interval, sleep=self.stop_event.wait)
+        scheduler.reset()
+
+        start = 0
+        for k, packed in enumerate(plan.ops):
+            if not self.is_typing:
+                break
+
+            if self.wait_if_paused():
+                scheduler.reset()
+                estimator.resume()
+
+            if not self.is_typing:
+                break
+
+            if stats:
+                started = clock()
+                handlers[packed >> OP_SHIFT](packed & VALUE_MASK)
+                stats.record_inject(clock() - started)
+                overshoot = scheduler.wait()
+                if overshoot is not None:
+                    stats.record_overshoot(overshoot)
+            else:
+                handlers[packed >> OP_SHIFT](packed & VALUE_MASK)
+                scheduler.wait()
+
+            end = ends[k]
+            estimator.record(entry_kind(packed), end - start)
+            yield end - 1, text[start:end]
+            start = end
+
+    def run_burst(self, text):
+        plan = self.compile(text)
+        ops = plan.ops
+        breaks = plan.breaks
+        handlers = self.handlers
+        self.clusters = plan.clusters
+        estimator = self.estimator
+        estimator.begin_plan(plan)
+        stats = self.stats
+        sizer = ChunkSizer()
+        k = 0
+        b = 0
+        total = len(ops)
+
+        while k < total:
+            if self.wait_if_paused():
+                estimator.resume()
+
+            if not self.is_typing:
+                break
+
+            start = plan.start(k)
+
+            if b < len(breaks) and breaks[b] == k:
+                # Special key or untypeable character
+                packed = ops[k]
+                started = time.perf_counter()
+                handlers[packed >> OP_SHIFT](packed & VALUE_MASK)
+                if stats:
+                    stats.record_inject(time.perf_counter() - started)
+                estimator.record(entry_kind(packed))
+                yield start, text[start]
+                k += 1
+                b += 1
+                continue
+
+            # Plain run (whole clusters) up to the next break, capped at the chunk size
+            next_break = breaks[b] if b < len(breaks) else total
+            last = min(next_break, k + sizer.size)
+            end = plan.ends[last - 1]
+
+            chunk = text[start:end]
+            started = time.perf_counter()
+            self.send_chunk(chunk)
+            elapsed = time.perf_counter() - started
+            sizer.record(last - k, elapsed)
+            if stats:
+                stats.record_inject(elapsed)
+            estimator.record('plain' if chunk.isascii() else 'unicode', end - start)
+
+            yield end - 1, text[end - 1]
+            k = last
+
+    def pause(self):
+        self.resume_event.clear()
+
+    def resume(self):
+        self.resume_event.set()
+
+    def toggle_pause(self):
+        if self.is_paused:
+            self.resume()
+        else:
+            self.pause()
+        return self.is_paused
+
+    def reset(self):
+        """Clear a previous stop so the engine can be run again"""
+        self.stop_event.clear()
+        self.resume_event.set()
+
+    def stop(self):
+        """Stop the current run; a stop before run() starts cancels it"""
+        self.stop_event.set()
+        # Wake a paused run so it can notice the stop
+        self.resume_event.set()
@@ -0,0 +1,61 @@
+"""WSGI server for the local API
+
+Uses waitress (a production-grade threaded server) when it is installed and
+falls back to werkzeug's threaded server otherwise. TYPINGBOT_SERVER=waitress
+or TYPINGBOT_SERVER=werkzeug forces one. Both bind in create_server(), so
+the port is known (and connectable) before serve_forever() is called.
+
+Each streaming response (/api/start-typing, SSE progress) holds a worker
+thread for as long as the job runs, so the pool is sized to leave threads
+free for pause/stop calls while several streams are open.
+"""
+import os
+
+SERVER_ENV = 'TYPINGBOT_SERVER'
+WAITRESS = 'waitress'
+WERKZEUG = 'werkzeug'
+
+# Worker threads for waitress (werkzeug starts a thread per request)
+SERVER_THREADS = 16
+
+
+class LocalServer:
+    """A bound WSGI server with a common interface for either backend"""
+    def __init__(self, backend, port, serve_forever, shutdown):
+        self.backend = backend
+        self.port = port
+        self.serve_forever = serve_forever
+        self.shutdown = shutdown
+
+
+def default_backend():
+    backend = os.environ.get(SERVER_ENV, '').lower()
+    if backend in (WAITRESS, WERKZEUG):
+        return backend
+    try:
+        import waitress  # noqa: F401
+        return WAITRESS
+    except ImportError:
+        return WERKZEUG
+
+
+def create_server(app, host='127.0.0.1', port=0, backend=None, threads=SERVER_THREADS):
+    """Bind a server for app; port 0 lets the OS pick a free port"""
+    backend = backend or default_backend()
+
+    if backend == WAITRESS:
+        from waitress.server import create_server as create_waitress
+
+        server = create_waitress(
+            app, host=host, port=port,
+            threads=threads,
+            ident='TypingBot',
+            # Paused jobs can leave a stream silent for a long time
+            channel_timeout=3600
+        )
+        return LocalServer(WAITRESS, server.effective_port, server.run, server.close)
+
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    return LocalServer(WERKZEUG, server.port, server.serve_forever, server.shutdown)